@@ -0,0 +1,122 @@
+import random
+
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.management.color import no_style
+from django.db import connection
+from kesha.models import Account, Booking, Entry, Parent, ParentClosure
+from kesha.utils import chunked
+
+
+def next_id(model):
+    last = model.objects.order_by("-pk").values_list("pk", flat=True).first()
+    return (last or 0) + 1
+
+
+def reset_sequences():
+    """Moves the primary key sequences past the explicitly set ids."""
+    models = [Parent, ParentClosure, Account, Booking, Entry]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+def generate_tree(depth, width):
+    """
+    Creates width root parents, each with width children, down to depth levels,
+    together with their closure table. Returns the ids of the leaf parents.
+    """
+    first = next_id(Parent)
+    parents, links, level = [], [], [(None, [])]
+    for _ in range(depth):
+        next_level = []
+        for parent_id, ancestors in level:
+            for _ in range(width):
+                pk = first + len(parents)
+                parents.append(
+                    Parent(
+                        pk=pk,
+                        name=f"Parent {pk}",
+                        slug=f"bench-parent-{pk}",
+                        active=True,
+                        parent_id=parent_id,
+                    )
+                )
+                path = ancestors + [pk]
+                links += [
+                    ParentClosure(
+                        ancestor_id=ancestor,
+                        descendant_id=pk,
+                        depth=len(path) - index - 1,
+                    )
+                    for index, ancestor in enumerate(path)
+                ]
+                next_level.append((pk, path))
+        level = next_level
+    Parent.objects.bulk_create(parents, batch_size=1000)
+    ParentClosure.objects.bulk_create(links, batch_size=1000)
+    return [pk for pk, _ in level]
+
+
+def generate_ledger(
+    depth=3,
+    width=3,
+    accounts=100,
+    entries_per_account=100,
+    years=3,
+    batch_size=10000,
+    seed=None,
+):
+    """
+    Creates a synthetic, balanced ledger with bulk inserts: a Parent tree of the
+    given depth and width, accounts spread over its leaves and
+    entries_per_account entries per account, booked in debit/credit pairs on
+    random accounts and dates over the last years.
+    Returns the number of created parents, accounts, bookings and entries.
+    """
+    rng = random.Random(seed)
+    leaves = generate_tree(depth, width)
+    first = next_id(Account)
+    account_ids = list(range(first, first + accounts))
+    Account.objects.bulk_create(
+        (
+            Account(
+                pk=pk,
+                name=f"Account {pk}",
+                slug=f"bench-account-{pk}",
+                parent_id=leaves[index % len(leaves)],
+            )
+            for index, pk in enumerate(account_ids)
+        ),
+        batch_size=1000,
+    )
+
+    slots = [pk for pk in account_ids for _ in range(entries_per_account)]
+    rng.shuffle(slots)
+    pairs = list(zip(slots[::2], slots[1::2]))
+    first = next_id(Booking)
+    start = date.today() - timedelta(days=365 * years)
+    for chunk in chunked(enumerate(pairs, first), batch_size // 2):
+        bookings, entries = [], []
+        for pk, (debit_account, credit_account) in chunk:
+            amount = Decimal(rng.randint(1, 1000000)) / 100
+            bookings.append(
+                Booking(
+                    pk=pk,
+                    text=f"Booking {pk}",
+                    date=start + timedelta(days=rng.randrange(365 * years)),
+                )
+            )
+            entries += [
+                Entry(account_id=debit_account, booking_id=pk, debit=amount),
+                Entry(account_id=credit_account, booking_id=pk, credit=amount),
+            ]
+        Booking.objects.bulk_create(bookings)
+        Entry.objects.bulk_create(entries)
+    reset_sequences()
+    return {
+        "parents": sum(width**level for level in range(1, depth + 1)),
+        "accounts": accounts,
+        "bookings": len(pairs),
+        "entries": 2 * len(pairs),
+    }
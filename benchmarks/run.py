@@ -0,0 +1,105 @@
+"""
+Times the main kesha operations on a synthetic ledger and records their
+query counts, e.g.:
+
+    python -m benchmarks.run --entries 100000 --depth 4 --width 3
+
+Uses the database of DJANGO_SETTINGS_MODULE (tests.settings by default, an
+in-memory SQLite database), which is migrated before the ledger is generated.
+"""
+
+import argparse
+import os
+import time
+
+import django
+
+
+def measure(name, func, rows):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+    rows.append((name, seconds, len(context.captured_queries)))
+
+
+def run(options):
+    from datetime import date
+    from django.core.management import call_command
+    from kesha.models import Account, Booking, Parent
+    from benchmarks.ledger import generate_ledger
+
+    call_command("migrate", verbosity=0)
+    rows = []
+    accounts = options.accounts
+    entries_per_account = max(options.entries // accounts, 2)
+    counts = {}
+    measure(
+        "generate ledger",
+        lambda: counts.update(
+            generate_ledger(
+                depth=options.depth,
+                width=options.width,
+                accounts=accounts,
+                entries_per_account=entries_per_account,
+                seed=options.seed,
+            )
+        ),
+        rows,
+    )
+    root = Parent.objects.get_roots().first()
+    sample = list(Account.objects.all()[: options.sample])
+    import_account = sample[0]
+    as_of = date.today().replace(month=1, day=1)
+
+    measure("Parent.get_sums (root)", root.get_sums, rows)
+    measure("Parent.get_sums (root, as of)", lambda: root.get_sums(as_of=as_of), rows)
+    measure("Parent.objects.trial_balance", Parent.objects.trial_balance, rows)
+    measure(
+        f"Account.get_entry_sum x {len(sample)}",
+        lambda: [account.get_entry_sum("debit") for account in sample],
+        rows,
+    )
+    measure(
+        f"BookingManager.bulk_import ({options.import_rows} rows)",
+        lambda: Booking.objects.bulk_import(
+            ({"text": f"Import {i}", "debit": 1} for i in range(options.import_rows)),
+            import_account,
+        ),
+        rows,
+    )
+    open_bookings = Booking.objects.exclude(text__startswith="Import")
+    measure(
+        "Booking.objects.finalize",
+        lambda: Booking.objects.finalize(open_bookings),
+        rows,
+    )
+
+    print(", ".join(f"{count} {name}" for name, count in counts.items()))
+    width = max(len(name) for name, _, _ in rows)
+    print(f"{'operation':<{width}}  {'seconds':>9}  {'queries':>7}")
+    for name, seconds, queries in rows:
+        print(f"{name:<{width}}  {seconds:>9.4f}  {queries:>7}")
+    return rows
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--width", type=int, default=3)
+    parser.add_argument("--sample", type=int, default=20, help="Accounts to sum up.")
+    parser.add_argument("--import-rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args(args)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+    django.setup()
+    return run(options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Optional cache of Account and Parent balances.
+
+Enabled by the KESHA_BALANCE_CACHE setting. Balances are stored in the Django
+cache named by KESHA_BALANCE_CACHE_ALIAS or, by default, in a process local LRU
+memory cache. Writes to entries, finalized bookings and moved accounts or
+parents invalidate the balances of the affected accounts and of all their
+ancestor parents once the writing transaction commits.
+"""
+
+import functools
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from kesha.routers import primary_reads
+
+COLUMNS = ("debit", "credit")
+DEFAULT_TIMEOUT = 600
+
+_local_cache = None
+
+
+def use_balance_cache():
+    return getattr(settings, "KESHA_BALANCE_CACHE", False)
+
+
+def get_cache():
+    global _local_cache
+    alias = getattr(settings, "KESHA_BALANCE_CACHE_ALIAS", None)
+    if alias is not None:
+        return caches[alias]
+    if _local_cache is None:
+        _local_cache = LocMemCache(
+            "kesha-balances", {"OPTIONS": {"MAX_ENTRIES": 10000}}
+        )
+    return _local_cache
+
+
+def balance_key(model_name, pk, column):
+    return f"kesha:balance:{model_name}:{pk}:{column}"
+
+
+def cached_balance(obj, column, compute):
+    """
+    Returns the cached balance column of obj, computing it on the primary on a
+    miss.
+    """
+    if not use_balance_cache():
+        return compute(column)
+    cache = get_cache()
+    key = balance_key(obj._meta.model_name, obj.pk, column)
+    value = cache.get(key)
+    if value is None:
+        # The keys do not tell databases apart and read replicas may lag
+        # behind, so cached balances are computed on the primary.
+        with primary_reads():
+            value = compute(column)
+        cache.set(
+            key,
+            value,
+            getattr(settings, "KESHA_BALANCE_CACHE_TIMEOUT", DEFAULT_TIMEOUT),
+        )
+    return value
+
+
+def _delete_on_commit(keys):
+    # Balances dropped before the commit could be cached again from the
+    # previous state by concurrent readers.
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(functools.partial(get_cache().delete_many, keys))
+
+
+def _ancestor_keys(parents):
+    ancestors = parents.ancestors().values_list("pk", flat=True)
+    return [balance_key("parent", pk, column) for pk in ancestors for column in COLUMNS]
+
+
+def invalidate_parents(parent_ids):
+    """
+    Drops the balances of parents and all of their ancestors, once the current
+    transaction commits.
+    """
+    from kesha.models import Parent
+
+    if use_balance_cache():
+        _delete_on_commit(
+            _ancestor_keys(Parent.objects.filter(pk__in=set(parent_ids) - {None}))
+        )
+
+
+def invalidate_accounts(account_ids):
+    """
+    Drops the balances of accounts and of all parents above them, once the
+    current transaction commits. account_ids may be a lazy queryset, it is
+    only evaluated (right away) if the cache is enabled.
+    """
+    from kesha.models import Parent
+
+    if not use_balance_cache():
+        return
+    account_ids = set(account_ids)
+    _delete_on_commit(
+        [balance_key("account", pk, column) for pk in account_ids for column in COLUMNS]
+        + _ancestor_keys(Parent.objects.filter(child_accounts__in=account_ids))
+    )
@@ -0,0 +1,168 @@
+"""
+Tamper evident hash chain over finalized bookings.
+
+Enabled by the KESHA_HASH_CHAIN setting. Whenever bookings become done, a
+ChainLink is appended per booking, holding the SHA-256 digest of the previous
+link's digest and the booking with its entries. Changing, deleting or
+reordering any finalized booking or entry afterwards breaks the chain from
+that link on. verify_chain rehashes the links after the last checkpoint only
+and records a new checkpoint once they are valid.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import transaction
+from kesha.utils import chunked
+
+GENESIS = "0" * 64
+
+
+class ChainError(Exception):
+    def __init__(self, sequence, msg=None):
+        self.sequence = sequence
+        super().__init__(msg or f"The hash chain is broken at link {sequence}.")
+
+
+def use_hash_chain():
+    return getattr(settings, "KESHA_HASH_CHAIN", False)
+
+
+def entry_rows(booking_ids, archived=False):
+    """
+    Returns the entries (or archived entries) of booking_ids as lists of their
+    hashed fields per booking.
+    """
+    from kesha.models import ArchivedEntry, Entry
+
+    rows = {pk: [] for pk in booking_ids}
+    entries = (
+        (ArchivedEntry if archived else Entry)
+        .objects.filter(booking__in=booking_ids)
+        .order_by("pk")
+        .values_list(
+            "booking",
+            "pk",
+            "account",
+            "virtual",
+            "debit",
+            "debit_currency",
+            "credit",
+            "credit_currency",
+        )
+    )
+    for booking, pk, account, virtual, debit, debit_cur, credit, credit_cur in entries:
+        rows[booking].append(
+            [
+                pk,
+                account,
+                virtual,
+                None if debit is None else f"{debit} {debit_cur}",
+                None if credit is None else f"{credit} {credit_cur}",
+            ]
+        )
+    return rows
+
+
+def link_digest(previous, booking, entries):
+    payload = json.dumps(
+        [booking.pk, booking.date.isoformat(), booking.text, entries],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(f"{previous}{payload}".encode()).hexdigest()
+
+
+def extend_chain(booking_ids):
+    """
+    Appends links for the just finalized bookings (in primary key order) to
+    the chain, with a constant number of queries. Must run in the transaction
+    which finalizes them.
+    """
+    from kesha.models import Booking, ChainLink
+
+    if not use_hash_chain() or not booking_ids:
+        return []
+    last = ChainLink.objects.select_for_update().order_by("-sequence").first()
+    sequence, digest = (last.sequence, last.digest) if last else (0, GENESIS)
+    bookings = Booking.objects.filter(pk__in=booking_ids).order_by("pk")
+    entries = entry_rows(booking_ids)
+    links = []
+    for booking in bookings:
+        sequence += 1
+        digest = link_digest(digest, booking, entries[booking.pk])
+        links.append(ChainLink(booking=booking, sequence=sequence, digest=digest))
+    return ChainLink.objects.bulk_create(links)
+
+
+def chain_unlinked(chunk_size=1000):
+    """
+    Links finalized bookings which are not chained yet, e.g. those finalized
+    before the chain was enabled. Returns the number of new links.
+    """
+    from kesha.models import Booking
+
+    unlinked = (
+        Booking.objects.filter(done=True, chain_link=None)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    links = 0
+    for chunk in chunked(unlinked.iterator(chunk_size=chunk_size), chunk_size):
+        with transaction.atomic():
+            links += len(extend_chain(chunk))
+    return links
+
+
+def verify_chain(full=False, chunk_size=1000):
+    """
+    Rehashes the links after the last checkpoint (all links with full) and
+    records a checkpoint at the last of them. Raises ChainError at the first
+    broken link, including finalized bookings which were never linked.
+    Returns the number of verified links.
+    """
+    from kesha.models import Booking, ChainCheckpoint, ChainLink
+
+    checkpoint = None if full else ChainCheckpoint.objects.order_by("-sequence").first()
+    sequence, digest = (
+        (checkpoint.sequence, checkpoint.digest) if checkpoint else (0, GENESIS)
+    )
+    start = sequence
+    if (
+        checkpoint
+        and not ChainLink.objects.filter(
+            sequence=checkpoint.sequence, digest=checkpoint.digest
+        ).exists()
+    ):
+        raise ChainError(checkpoint.sequence)
+    unlinked = Booking.objects.filter(done=True, chain_link=None).first()
+    if unlinked is not None:
+        raise ChainError(None, f"Booking {unlinked.pk} is done but not chained.")
+    links = (
+        ChainLink.objects.filter(sequence__gt=start)
+        .select_related("booking", "archived_booking")
+        .order_by("sequence")
+    )
+    for chunk in chunked(links.iterator(chunk_size=chunk_size), chunk_size):
+        entries = entry_rows([link.booking_id for link in chunk if link.booking_id])
+        entries.update(
+            entry_rows(
+                [
+                    link.archived_booking_id
+                    for link in chunk
+                    if link.archived_booking_id
+                ],
+                archived=True,
+            )
+        )
+        for link in chunk:
+            booking = link.booking or link.archived_booking
+            if link.sequence != sequence + 1 or booking is None or not booking.done:
+                raise ChainError(sequence + 1)
+            digest = link_digest(digest, booking, entries[booking.pk])
+            if digest != link.digest:
+                raise ChainError(link.sequence)
+            sequence = link.sequence
+    if sequence > start:
+        ChainCheckpoint.objects.create(sequence=sequence, digest=digest)
+    return sequence - start
@@ -0,0 +1,197 @@
+"""
+Bulk loading of charts of accounts.
+
+A chart is a list of parent nodes, each a dict with a "name", optional
+"children" (parent nodes) and "accounts" (dicts with a "name" and an optional
+"virtual" flag). Root nodes need an "active" flag, unless the chart is loaded
+below an existing parent; all other parents inherit it, as in Parent.save.
+"""
+
+import csv
+import yaml
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils.text import slugify
+from django.utils.translation import gettext_lazy as _
+from kesha.models import Account, Parent, ParentClosure
+from pathlib import Path
+
+TRUE_VALUES = ("1", "true", "yes", "y")
+
+
+def unique_slugs(model, names):
+    """
+    Returns a slug per name which is neither taken in the table of model nor
+    repeated within names, appending -2, -3, ... on collisions.
+    """
+    bases = [slugify(name) for name in names]
+    slugs, free, taken = bases, set(), set()
+    while True:
+        unchecked = set(slugs) - free - taken
+        if not unchecked:
+            return slugs
+        existing = set(
+            model._base_manager.filter(slug__in=unchecked).values_list(
+                "slug", flat=True
+            )
+        )
+        taken |= existing
+        free |= unchecked - existing
+        seen, slugs = set(), []
+        for base in bases:
+            slug, n = base, 2
+            while slug in taken or slug in seen:
+                slug, n = f"{base}-{n}", n + 1
+            seen.add(slug)
+            slugs.append(slug)
+
+
+def check_names(nodes, parent):
+    names = [node["name"] for node in nodes]
+    if len(set(names)) != len(names):
+        raise ValidationError(_(f"Duplicate names below {parent or 'the root'}."))
+
+
+def bulk_create_with_pks(model, objects, batch_size):
+    """Bulk creates objects and sets their primary keys, looked up by slug if needed."""
+    model.objects.bulk_create(objects, batch_size=batch_size)
+    if not connection.features.can_return_rows_from_bulk_insert:
+        pks = dict(
+            model.objects.filter(slug__in=[obj.slug for obj in objects]).values_list(
+                "slug", "pk"
+            )
+        )
+        for obj in objects:
+            obj.pk = pks[obj.slug]
+            obj._state.adding = False
+
+
+@transaction.atomic
+def load_chart(chart, parent=None, batch_size=1000):
+    """
+    Creates the parents and accounts of chart (below parent, if given) with
+    one bulk insert per tree level and returns them as two lists.
+    """
+    levels, accounts = [], []
+    level = [(node, parent) for node in chart]
+    check_names(chart, parent)
+    while level:
+        parents, next_level = [], []
+        for node, above in level:
+            if above is None and "active" not in node:
+                raise ValidationError(_(f"Root {node['name']} needs an active flag."))
+            obj = Parent(
+                name=node["name"],
+                parent=above,
+                active=above.active if above is not None else node["active"],
+            )
+            parents.append(obj)
+            check_names(node.get("children", []), obj)
+            check_names(node.get("accounts", []), obj)
+            next_level += [(child, obj) for child in node.get("children", [])]
+            accounts += [
+                Account(
+                    name=account["name"],
+                    parent=obj,
+                    virtual=account.get("virtual", False),
+                )
+                for account in node.get("accounts", [])
+            ]
+        levels.append(parents)
+        level = next_level
+
+    parents = [obj for objects in levels for obj in objects]
+    for obj, slug in zip(parents, unique_slugs(Parent, [p.name for p in parents])):
+        obj.slug = slug
+    for obj, slug in zip(accounts, unique_slugs(Account, [a.name for a in accounts])):
+        obj.slug = slug
+
+    ancestors = {}
+    if parent is not None:
+        ancestors[parent.pk] = list(
+            ParentClosure.objects.filter(descendant=parent).values_list(
+                "ancestor", "depth"
+            )
+        )
+    links = []
+    for objects in levels:
+        for obj in objects:
+            # Sets parent_id now that the parent above has been inserted.
+            obj.parent = obj.parent
+        bulk_create_with_pks(Parent, objects, batch_size)
+        for obj in objects:
+            # So a later save does not relink the node.
+            obj.mark_saved()
+            ancestors[obj.pk] = [(obj.pk, 0)] + [
+                (ancestor, depth + 1)
+                for ancestor, depth in ancestors.get(obj.parent_id, [])
+            ]
+            links += [
+                ParentClosure(ancestor_id=ancestor, descendant_id=obj.pk, depth=depth)
+                for ancestor, depth in ancestors[obj.pk]
+            ]
+    ParentClosure.objects.bulk_create(links, batch_size=batch_size)
+    for obj in accounts:
+        obj.parent = obj.parent
+        obj.mark_saved()
+    Account.objects.bulk_create(accounts, batch_size=batch_size)
+    return parents, accounts
+
+
+def read_chart_yaml(stream):
+    chart = yaml.safe_load(stream) or []
+    if not isinstance(chart, list):
+        raise ValueError("YAML charts must contain a list of root parents.")
+    return chart
+
+
+def read_chart_csv(stream):
+    """
+    Reads a chart from CSV rows with the columns type ("parent" or "account"),
+    path (the names of the parents above, joined by "/"), name, active and
+    virtual. Parents have to precede the rows below them.
+    """
+    chart, nodes = [], {}
+    for row in csv.DictReader(stream):
+        path = row.get("path") or ""
+        siblings = chart
+        if path:
+            if path not in nodes:
+                raise ValueError(f"Unknown parent {path} of {row['name']}.")
+            above = nodes[path]
+        if row.get("type", "parent") == "account":
+            if not path:
+                raise ValueError(f"Account {row['name']} needs a parent.")
+            above.setdefault("accounts", []).append(
+                {
+                    "name": row["name"],
+                    "virtual": (row.get("virtual") or "").lower() in TRUE_VALUES,
+                }
+            )
+            continue
+        node = {"name": row["name"]}
+        if row.get("active"):
+            node["active"] = row["active"].lower() in TRUE_VALUES
+        if path:
+            siblings = above.setdefault("children", [])
+        siblings.append(node)
+        nodes["/".join(filter(None, [path, row["name"]]))] = node
+    return chart
+
+
+CHART_READERS = {
+    "yaml": read_chart_yaml,
+    "yml": read_chart_yaml,
+    "csv": read_chart_csv,
+}
+
+
+def load_chart_file(path, parent=None, format=None, **kwargs):
+    path = Path(path)
+    format = format or path.suffix.lstrip(".").lower()
+    if format not in CHART_READERS:
+        raise ValueError(f"Unsupported chart format: {format}")
+    with open(path, newline="", encoding="utf-8") as infile:
+        chart = CHART_READERS[format](infile)
+    return load_chart(chart, parent, **kwargs)
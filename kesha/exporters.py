@@ -0,0 +1,85 @@
+import csv
+import json
+
+from kesha.models import Entry
+from kesha.routers import reporting_alias
+
+FIELDS = {
+    "booking": "booking_id",
+    "date": "booking__date",
+    "text": "booking__text",
+    "done": "booking__done",
+    "account": "account__slug",
+    "virtual": "virtual",
+    "debit": "debit",
+    "debit_currency": "debit_currency",
+    "credit": "credit",
+    "credit_currency": "credit_currency",
+}
+
+
+class Echo:
+    """A file like object returning what is written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def journal_rows(entries=None, chunk_size=2000):
+    """
+    Yields the entries (all by default) joined with their booking and account
+    as flat dicts, ordered by booking. Rows are fetched from a server side
+    cursor chunk_size at a time, so memory use does not grow with the journal.
+    Reads from the KESHA_READ_DATABASE replica, if configured.
+    """
+    if entries is None:
+        entries = Entry.objects.all()
+    # Resolved now rather than when the rows are first iterated, which may be
+    # outside of the caller's routing block.
+    alias = reporting_alias()
+    if alias is not None:
+        entries = entries.using(alias)
+    return _journal_rows(entries, chunk_size)
+
+
+def _journal_rows(entries, chunk_size):
+    rows = (
+        entries.order_by("booking__date", "booking_id", "pk")
+        .values_list(*FIELDS.values())
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        row = dict(zip(FIELDS, row))
+        row["date"] = row["date"].isoformat()
+        for key in ("debit", "credit"):
+            if row[key] is None:
+                row[f"{key}_currency"] = None
+            else:
+                row[key] = str(row[key])
+        yield row
+
+
+def write_csv(rows):
+    writer = csv.DictWriter(Echo(), fieldnames=list(FIELDS))
+    yield writer.writerow(dict(zip(FIELDS, FIELDS)))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+WRITERS = {
+    "csv": (write_csv, "text/csv"),
+    "jsonl": (write_jsonl, "application/x-ndjson"),
+}
+
+
+def export_journal(format, entries=None, chunk_size=2000):
+    """Yields the journal of entries line by line as CSV or JSON lines."""
+    if format not in WRITERS:
+        raise ValueError(f"Unsupported export format: {format}")
+    writer, _ = WRITERS[format]
+    return writer(journal_rows(entries, chunk_size))
@@ -0,0 +1,105 @@
+import csv
+import json
+import yaml
+
+from datetime import date
+from decimal import Decimal
+from django.db import transaction
+from itertools import islice
+from pathlib import Path
+from kesha.models import Booking, ImportProgress
+from kesha.utils import chunked
+
+AMOUNT_KEYS = ("debit", "credit")
+
+
+def normalize(row):
+    """
+    Drops empty amounts and converts the remaining ones to Decimal, as well as
+    an optional booking date given as ISO string.
+    """
+    entry = {"text": row["text"]}
+    if row.get("date"):
+        entry["date"] = (
+            row["date"]
+            if isinstance(row["date"], date)
+            else date.fromisoformat(row["date"])
+        )
+    for key in AMOUNT_KEYS:
+        if row.get(key) not in (None, ""):
+            entry[key] = Decimal(str(row[key]))
+    return entry
+
+
+def read_yaml(stream):
+    """
+    Yields the items of a top level YAML sequence one at a time, so the
+    document is never loaded as a whole.
+    """
+    loader = yaml.SafeLoader(stream)
+    try:
+        loader.get_event()  # StreamStart
+        if loader.check_event(yaml.StreamEndEvent):
+            return
+        loader.get_event()  # DocumentStart
+        if not loader.check_event(yaml.SequenceStartEvent):
+            raise ValueError("YAML import files must contain a list of entries.")
+        loader.get_event()
+        while not loader.check_event(yaml.SequenceEndEvent):
+            yield loader.construct_document(loader.compose_node(None, None))
+    finally:
+        loader.dispose()
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+def read_jsonl(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+READERS = {
+    "yaml": read_yaml,
+    "yml": read_yaml,
+    "csv": read_csv,
+    "jsonl": read_jsonl,
+    "json": read_jsonl,
+}
+
+
+def read_entries(stream, format):
+    for row in READERS[format](stream):
+        yield normalize(row)
+
+
+def import_entries(entries, account, source, chunk_size=1000, restart=False):
+    """
+    Imports entries chunk by chunk, each chunk in its own transaction together
+    with the import progress of source. An interrupted import resumes after the
+    last committed chunk. Yields the number of imported rows after each chunk.
+    """
+    progress, _ = ImportProgress.objects.get_or_create(source=source, account=account)
+    if restart:
+        progress.rows = 0
+        progress.save()
+    entries = islice(entries, progress.rows, None)
+    for chunk in chunked(entries, chunk_size):
+        with transaction.atomic():
+            Booking.objects.bulk_import(chunk, account, batch_size=chunk_size)
+            progress.rows += len(chunk)
+            progress.save()
+        yield progress.rows
+
+
+def import_file(path, account, format=None, **kwargs):
+    path = Path(path)
+    format = format or path.suffix.lstrip(".").lower()
+    if format not in READERS:
+        raise ValueError(f"Unsupported import format: {format}")
+    with open(path, newline="", encoding="utf-8") as infile:
+        yield from import_entries(
+            read_entries(infile, format), account, str(path.resolve()), **kwargs
+        )
@@ -0,0 +1,125 @@
+"""
+Call, query and timing statistics of kesha operations.
+
+Operations are registered with the instrument decorator. While a Recorder is
+active, every call of an instrumented operation records its wall time and the
+queries executed within it (including those of nested operations):
+
+    with Recorder() as recorder:
+        parent.debit
+    recorder.assert_max_queries("Parent.get_sum", 2)
+"""
+
+import functools
+import threading
+import time
+
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from django.db import connections
+
+OPERATIONS = set()
+
+_recorders = []
+_local = threading.local()
+
+
+def _active_operations():
+    if not hasattr(_local, "operations"):
+        _local.operations = []
+    return _local.operations
+
+
+def instrument(name=None):
+    """Registers the decorated function as operation name (its qualname by default)."""
+
+    def decorator(func):
+        operation = name or func.__qualname__
+        OPERATIONS.add(operation)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _recorders:
+                return func(*args, **kwargs)
+            operations = _active_operations()
+            operations.append(operation)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                operations.pop()
+                for recorder in _recorders:
+                    recorder.add_call(operation, seconds)
+
+        return wrapper
+
+    return decorator
+
+
+@dataclass
+class OperationStats:
+    calls: int = 0
+    queries: int = 0
+    seconds: float = 0.0
+
+
+class Recorder:
+    def __init__(self):
+        self.stats = {}
+        self._exit_stack = None
+
+    def __getitem__(self, operation):
+        return self.stats.get(operation, OperationStats())
+
+    def __enter__(self):
+        self._exit_stack = ExitStack()
+        for connection in connections.all():
+            self._exit_stack.enter_context(connection.execute_wrapper(self))
+        _recorders.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _recorders.remove(self)
+        self._exit_stack.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        for operation in set(_active_operations()):
+            self.stats.setdefault(operation, OperationStats()).queries += 1
+        return execute(sql, params, many, context)
+
+    def add_call(self, operation, seconds):
+        stats = self.stats.setdefault(operation, OperationStats())
+        stats.calls += 1
+        stats.seconds += seconds
+
+    def assert_max_queries(self, operation, queries):
+        if self[operation].queries > queries:
+            raise AssertionError(
+                f"{operation} executed {self[operation].queries} queries, "
+                f"at most {queries} expected"
+            )
+
+    def assert_max_calls(self, operation, calls):
+        if self[operation].calls > calls:
+            raise AssertionError(
+                f"{operation} was called {self[operation].calls} times, "
+                f"at most {calls} expected"
+            )
+
+    def report(self):
+        lines = [f"{'operation':<32} {'calls':>7} {'queries':>8} {'seconds':>9}"]
+        for operation, stats in sorted(self.stats.items()):
+            lines.append(
+                f"{operation:<32} {stats.calls:>7} {stats.queries:>8} "
+                f"{stats.seconds:>9.4f}"
+            )
+        return "\n".join(lines)
+
+
+@contextmanager
+def max_queries(operation, queries):
+    """Asserts that operation executes at most queries queries within the block."""
+    with Recorder() as recorder:
+        yield recorder
+    recorder.assert_max_queries(operation, queries)
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from kesha.importers import READERS, import_file
+from kesha.models import Account
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams entries from a YAML, CSV or JSON lines file into bookings on an "
+        "account. Interrupted imports resume after the last committed chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("account", help="Slug of the account to book onto.")
+        parser.add_argument("--format", choices=sorted(READERS))
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the progress of earlier runs and import from the start.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            account = Account.objects.get(slug=options["account"])
+        except Account.DoesNotExist:
+            raise CommandError(f"Account {options['account']} does not exist.")
+        rows = None
+        try:
+            for rows in import_file(
+                options["path"],
+                account,
+                format=options["format"],
+                chunk_size=options["chunk_size"],
+                restart=options["restart"],
+            ):
+                self.stdout.write(f"{rows} rows imported")
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+        if rows is None:
+            self.stdout.write("Nothing to import.")
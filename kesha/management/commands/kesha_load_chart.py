@@ -0,0 +1,30 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from kesha.charts import CHART_READERS, load_chart_file
+from kesha.models import Parent
+
+
+class Command(BaseCommand):
+    help = "Bulk loads a chart of accounts from a YAML or CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--parent", help="Slug of the parent to load below.")
+        parser.add_argument("--format", choices=sorted(CHART_READERS))
+
+    def handle(self, *args, **options):
+        parent = None
+        if options["parent"]:
+            try:
+                parent = Parent.objects.get(slug=options["parent"])
+            except Parent.DoesNotExist:
+                raise CommandError(f"Parent {options['parent']} does not exist.")
+        try:
+            parents, accounts = load_chart_file(
+                options["path"], parent, format=options["format"]
+            )
+        except (OSError, ValueError, ValidationError) as e:
+            raise CommandError(e)
+        self.stdout.write(
+            f"Loaded {len(parents)} parents and {len(accounts)} accounts."
+        )
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from kesha.models import AccountBalance
+
+
+class Command(BaseCommand):
+    help = "Recomputes the materialized account balances from all finalized entries."
+
+    def handle(self, *args, **options):
+        balances = AccountBalance.objects.rebuild()
+        self.stdout.write(f"Rebuilt balances of {len(balances)} accounts.")
@@ -0,0 +1,93 @@
+from datetime import date
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from kesha.models import Account, AccountBalance, Parent
+from kesha.recompute import recompute
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the balances of all accounts (or of the accounts below a "
+        "parent) in chunks, spread over a pool of worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--parent", help="Slug of the parent to recompute.")
+        parser.add_argument(
+            "--workers", type=int, help="Number of processes, all cores by default."
+        )
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument("--as-of", type=date.fromisoformat)
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument(
+            "--materialize",
+            action="store_true",
+            help="Rebuild the materialized balances of the finalized entries.",
+        )
+        group.add_argument(
+            "--audit",
+            action="store_true",
+            help="Compare the finalized entries with the materialized balances.",
+        )
+
+    def handle(self, *args, **options):
+        accounts = Account.objects.all()
+        if options["parent"]:
+            try:
+                parent = Parent.objects.get(slug=options["parent"])
+            except Parent.DoesNotExist:
+                raise CommandError(f"Parent {options['parent']} does not exist.")
+            accounts = parent.accounts_under()
+        kwargs = {}
+        if options["as_of"]:
+            if options["materialize"] or options["audit"]:
+                raise CommandError(
+                    "--as-of can not be combined with --materialize or --audit."
+                )
+            kwargs["as_of"] = options["as_of"]
+        elif options["audit"]:
+            kwargs["finalized"] = True
+        sums = recompute(
+            accounts,
+            workers=options["workers"],
+            chunk_size=options["chunk_size"],
+            materialize=options["materialize"],
+            **kwargs,
+        )
+        if options["audit"]:
+            self.audit(sums)
+        elif options["verbosity"] > 1:
+            slugs = dict(Account.objects.values_list("pk", "slug"))
+            for pk, columns in sorted(sums.items()):
+                self.stdout.write(f"{slugs[pk]} {columns['debit']} {columns['credit']}")
+        debit = sum((columns["debit"] for columns in sums.values()), Decimal(0.0))
+        credit = sum((columns["credit"] for columns in sums.values()), Decimal(0.0))
+        self.stdout.write(
+            f"Recomputed balances of {len(sums)} accounts: "
+            f"debit {debit}, credit {credit}."
+        )
+
+    def audit(self, sums):
+        stored = {
+            row["account"]: row
+            for row in AccountBalance.objects.filter(account__in=sums).values(
+                "account", "debit", "credit"
+            )
+        }
+        zero = dict.fromkeys(("debit", "credit"), Decimal(0.0))
+        mismatches = [
+            pk
+            for pk, columns in sums.items()
+            if any(columns[c] != stored.get(pk, zero)[c] for c in ("debit", "credit"))
+        ]
+        slugs = dict(
+            Account.objects.filter(pk__in=mismatches).values_list("pk", "slug")
+        )
+        for pk in mismatches:
+            balance = stored.get(pk, zero)
+            self.stdout.write(
+                f"{slugs[pk]}: stored {balance['debit']}/{balance['credit']}, "
+                f"recomputed {sums[pk]['debit']}/{sums[pk]['credit']}"
+            )
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} materialized balances differ.")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from kesha.chain import ChainError, chain_unlinked, verify_chain
+
+
+class Command(BaseCommand):
+    help = (
+        "Verifies the hash chain of finalized bookings from the last checkpoint "
+        "on and records a new checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Verify the whole chain instead of starting at the last checkpoint.",
+        )
+        parser.add_argument(
+            "--link-unchained",
+            action="store_true",
+            help="Chain finalized bookings which are not linked yet before verifying.",
+        )
+
+    def handle(self, *args, **options):
+        if options["link_unchained"]:
+            self.stdout.write(f"Linked {chain_unlinked()} finalized bookings.")
+        try:
+            links = verify_chain(full=options["full"])
+        except ChainError as e:
+            raise CommandError(e)
+        self.stdout.write(f"Verified {links} links.")
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_closure(apps, schema_editor):
+    Parent = apps.get_model("kesha", "Parent")
+    ParentClosure = apps.get_model("kesha", "ParentClosure")
+    parents = dict(Parent.objects.values_list("pk", "parent_id"))
+    links = []
+    for pk in parents:
+        ancestor, depth = pk, 0
+        while ancestor is not None:
+            links.append(
+                ParentClosure(ancestor_id=ancestor, descendant_id=pk, depth=depth)
+            )
+            ancestor, depth = parents[ancestor], depth + 1
+    ParentClosure.objects.bulk_create(links)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kesha", "0007_accountbalance"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ParentClosure",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("depth", models.PositiveIntegerField()),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="kesha.parent",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to="kesha.parent",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("ancestor", "descendant")},
+            },
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:28
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kesha", "0009_importprogress"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Period",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("name", models.CharField(max_length=255)),
+                ("start", models.DateField()),
+                ("end", models.DateField()),
+                ("closed", models.BooleanField(default=False)),
+            ],
+            options={
+                "ordering": ["start"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ClosingBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("virtual", models.BooleanField(default=False)),
+                (
+                    "debit",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0"), max_digits=20
+                    ),
+                ),
+                (
+                    "credit",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0"), max_digits=20
+                    ),
+                ),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="closing_balances",
+                        to="kesha.account",
+                    ),
+                ),
+                (
+                    "period",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="closing_balances",
+                        to="kesha.period",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("period", "account", "virtual")},
+            },
+        ),
+    ]
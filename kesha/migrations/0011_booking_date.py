@@ -0,0 +1,26 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:30
+
+import datetime
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def date_from_created_at(apps, schema_editor):
+    Booking = apps.get_model("kesha", "Booking")
+    Booking.objects.update(date=TruncDate("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kesha", "0010_period"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="date",
+            field=models.DateField(db_index=True, default=datetime.date.today),
+        ),
+        migrations.RunPython(date_from_created_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kesha", "0011_booking_date"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(
+                fields=["account", "virtual", "debit", "credit"],
+                name="kesha_entry_account_sums_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(
+                fields=["booking", "virtual", "debit", "credit"],
+                name="kesha_entry_booking_sums_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kesha", "0012_entry_sums_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="closingbalance",
+            name="currency",
+            field=models.CharField(default="EUR", max_length=3),
+        ),
+        migrations.AlterUniqueTogether(
+            name="closingbalance",
+            unique_together={("period", "account", "virtual", "currency")},
+        ),
+    ]
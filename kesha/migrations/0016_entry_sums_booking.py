@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kesha", "0015_archive"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="entry",
+            name="kesha_entry_account_sums_idx",
+        ),
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(
+                fields=["account", "virtual", "booking", "debit", "credit"],
+                name="kesha_entry_account_sums_idx",
+            ),
+        ),
+    ]
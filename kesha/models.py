@@ -1,12 +1,82 @@
+import asyncio
+import functools
+import operator
+
+from datetime import date
 from decimal import Decimal
+from itertools import chain
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import Sum
+from django.db import connections, models, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import gettext as _
 from djmoney.models.fields import MoneyField
+from djmoney.money import Money
+from kesha.cache import cached_balance, invalidate_accounts, invalidate_parents
+from kesha.chain import extend_chain
+from kesha.instrumentation import instrument
+from kesha.rollup import carried_sums, subtree_sums, trial_balance
+from kesha.routers import on_primary, reporting
+from kesha.utils import chunked, to_async
 
 MODEL_DONE_ERROR_MSG = _("Models marked as done can not be edited anymore.")
+BOOKING_KEYS = ("text", "date")
+DEFAULT_CURRENCY = "EUR"
+
+# The currency of an entry is the one of its debit or credit, whichever is set.
+ENTRY_CURRENCY = Case(
+    When(debit__isnull=False, then=F("debit_currency")),
+    default=F("credit_currency"),
+)
+
+
+def use_account_balances():
+    return getattr(settings, "KESHA_ACCOUNT_BALANCES", False)
+
+
+def currency_sums(rows):
+    """
+    Returns debit and credit as Money per currency of rows (a values queryset
+    grouped by currency), aggregated in a single GROUP BY query.
+    """
+    rows = rows.annotate(debit_sum=Sum("debit"), credit_sum=Sum("credit")).order_by()
+    return {
+        row["currency"]: {
+            column: Money(row[f"{column}_sum"] or Decimal(0.0), row["currency"])
+            for column in ("debit", "credit")
+        }
+        for row in rows
+    }
+
+
+def aggregate_sums(queryset):
+    """Returns the debit and credit sums of queryset, zero if it is empty."""
+    sums = queryset.aggregate(debit_sum=Sum("debit"), credit_sum=Sum("credit"))
+    return {
+        column: (
+            sums[f"{column}_sum"] if sums[f"{column}_sum"] is not None else Decimal(0.0)
+        )
+        for column in ("debit", "credit")
+    }
+
+
+def account_sum(queryset, column):
+    """Returns the sum of column over queryset per OuterRef account, zero if empty."""
+    sums = (
+        queryset.filter(account=OuterRef("pk"), virtual=OuterRef("virtual"))
+        .order_by()
+        .values("account")
+        .annotate(total=Sum(column))
+        .values("total")
+    )
+    return Coalesce(
+        Subquery(sums, output_field=models.DecimalField()),
+        Value(Decimal(0.0)),
+        output_field=models.DecimalField(),
+    )
 
 
 class ModelDoneError(Exception):
@@ -34,10 +104,60 @@ class SlugifiedModel(models.Model):
         super().save(*args, **kwargs)
 
 
-class ParentManager(models.Manager):
+class ParentQuerySet(models.QuerySet):
+    def descendants(self, include_self=True):
+        """Returns all parents below the parents of this queryset."""
+        links = ParentClosure.objects.filter(ancestor__in=self)
+        if not include_self:
+            links = links.exclude(depth=0)
+        return Parent.objects.filter(pk__in=links.values("descendant"))
+
+    def ancestors(self, include_self=True):
+        """Returns all parents above the parents of this queryset."""
+        links = ParentClosure.objects.filter(descendant__in=self)
+        if not include_self:
+            links = links.exclude(depth=0)
+        return Parent.objects.filter(pk__in=links.values("ancestor"))
+
+    def accounts_under(self):
+        """Returns all accounts in the subtrees of the parents of this queryset."""
+        return Account.objects.filter(
+            parent__in=ParentClosure.objects.filter(ancestor__in=self).values(
+                "descendant"
+            )
+        )
+
+    def set_active(self, active):
+        """
+        Sets active on the parents of this queryset and on all parents below
+        them. Returns the number of updated parents.
+        """
+        with transaction.atomic(using=self.db):
+            ids = list(self.values_list("pk", flat=True))
+            links = ParentClosure.objects.filter(ancestor__in=ids)
+            return Parent.objects.filter(pk__in=links.values("descendant")).update(
+                active=active, updated_at=timezone.now()
+            )
+
+
+class ParentManager(models.Manager.from_queryset(ParentQuerySet)):
     def get_roots(self):
         return Parent.objects.filter(parent=None)
 
+    @instrument()
+    @reporting
+    def trial_balance(self, as_of=None):
+        """Returns the root nodes of the whole tree with precomputed sums."""
+        return trial_balance(as_of)
+
+    async def atrial_balance(self, as_of=None):
+        return await to_async(self.trial_balance, concurrent=True)(as_of)
+
+    async def aget_sums(self, parents, start=None, as_of=None):
+        """Returns the sums of independent parents, queried concurrently."""
+        sums = await asyncio.gather(*(p.aget_sums(start, as_of) for p in parents))
+        return dict(zip((p.pk for p in parents), sums))
+
 
 class Parent(CreatedModifiedModel, SlugifiedModel):
     name = models.CharField(max_length=255)
@@ -49,37 +169,194 @@ class Parent(CreatedModifiedModel, SlugifiedModel):
         blank=True,
         related_name="child_parents",
     )
+    __parent_id = None
+    __active = None
+
     objects = ParentManager()
 
     class Meta:
         ordering = ["name", "active"]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__parent_id = self.parent_id
+        self.__active = self.active
+
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
         if self.parent:
             self.active = self.parent.active
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                ParentClosure.objects.insert_node(self)
+            elif self.parent_id != self.__parent_id:
+                invalidate_parents([self.__parent_id])
+                ParentClosure.objects.move_node(self)
+                invalidate_parents([self.pk])
+            if not adding and self.active != self.__active:
+                Parent.objects.filter(pk=self.pk).set_active(self.active)
+        self.mark_saved()
+
+    def mark_saved(self):
+        """Marks the parent and active flag as saved, e.g. after a bulk insert."""
+        self.__parent_id = self.parent_id
+        self.__active = self.active
+
+    def set_active(self, active):
+        """Sets active on this parent and its whole subtree."""
+        Parent.objects.filter(pk=self.pk).set_active(active)
+        self.active = self.__active = active
+
+    def descendants(self, include_self=True):
+        return Parent.objects.filter(pk=self.pk).descendants(include_self)
+
+    def ancestors(self, include_self=True):
+        return Parent.objects.filter(pk=self.pk).ancestors(include_self)
+
+    def accounts_under(self):
+        return Parent.objects.filter(pk=self.pk).accounts_under()
 
     @property
     def debit(self):
-        return self.get_sum("debit")
+        return cached_balance(self, "debit", self.get_sum)
 
     @property
     def credit(self):
-        return self.get_sum("credit")
+        return cached_balance(self, "credit", self.get_sum)
 
-    def get_sum(self, column):
+    @instrument()
+    @reporting
+    def get_sum(self, column, start=None, as_of=None):
         """Returns the sum of direct child accounts and child parents."""
-        account_sum = Entry.objects.filter(
-            account__parent=self, virtual=False
-        ).aggregate(Sum(column))[f"{column}__sum"]
-        account_sum = account_sum if account_sum is not None else Decimal(0.0)
-        parent_sum = sum([p.get_sum(column) for p in self.child_parents.all()])
-        parent_sum = parent_sum if parent_sum is not None else Decimal(0.0)
-        value = account_sum + parent_sum
-        return value
+        return self.get_sums(start, as_of)[column]
+
+    @reporting
+    def get_sums(self, start=None, as_of=None):
+        """
+        Returns debit and credit of the whole subtree, resolved in a single query.
+        Optionally limited to bookings dated from start and/or up to as_of.
+        """
+        return subtree_sums(self, start, as_of)
+
+    @reporting
+    def get_currency_sums(self, start=None, as_of=None):
+        """Returns debit and credit of the whole subtree as Money per currency."""
+        return subtree_sums(self, start, as_of, by_currency=True)
+
+    async def aget_sum(self, column, start=None, as_of=None):
+        return (await self.aget_sums(start, as_of))[column]
+
+    async def aget_sums(self, start=None, as_of=None):
+        return await to_async(self.get_sums, concurrent=True)(start, as_of)
+
+    async def aget_child_sums(self, start=None, as_of=None):
+        """Returns the sums of all child parents, queried concurrently."""
+        children = await to_async(list)(self.child_parents.all())
+        return await Parent.objects.aget_sums(children, start, as_of)
+
+
+class ParentClosureManager(models.Manager):
+    def insert_node(self, node):
+        """Links a new parent to itself and to all ancestors of its parent."""
+        links = [self.model(ancestor=node, descendant=node, depth=0)]
+        if node.parent_id is not None:
+            links += [
+                self.model(ancestor_id=ancestor, descendant=node, depth=depth + 1)
+                for ancestor, depth in self.filter(
+                    descendant_id=node.parent_id
+                ).values_list("ancestor", "depth")
+            ]
+        self.bulk_create(links)
+
+    def move_node(self, node):
+        """Relinks the subtree of a reparented parent to its new ancestors."""
+        subtree = list(self.filter(ancestor=node).values_list("descendant", "depth"))
+        subtree_ids = [descendant for descendant, _ in subtree]
+        if node.parent_id in subtree_ids:
+            raise ValidationError(_("A parent can not be moved below itself."))
+        self.filter(descendant__in=subtree_ids).exclude(
+            ancestor__in=subtree_ids
+        ).delete()
+        if node.parent_id is None:
+            return
+        ancestors = self.filter(descendant_id=node.parent_id).values_list(
+            "ancestor", "depth"
+        )
+        self.bulk_create(
+            self.model(
+                ancestor_id=ancestor,
+                descendant_id=descendant,
+                depth=ancestor_depth + descendant_depth + 1,
+            )
+            for ancestor, ancestor_depth in ancestors
+            for descendant, descendant_depth in subtree
+        )
+
+
+class ParentClosure(models.Model):
+    """Closure table of the Parent hierarchy, one row per ancestor/descendant pair."""
+
+    ancestor = models.ForeignKey(
+        "Parent", on_delete=models.CASCADE, related_name="descendant_links"
+    )
+    descendant = models.ForeignKey(
+        "Parent", on_delete=models.CASCADE, related_name="ancestor_links"
+    )
+    depth = models.PositiveIntegerField()
+
+    objects = ParentClosureManager()
+
+    class Meta:
+        unique_together = [["ancestor", "descendant"]]
+
+
+class AccountQuerySet(models.QuerySet):
+    def with_active(self):
+        """Annotates the active flag of the parent, read by Account.active."""
+        return self.annotate(parent_active=F("parent__active"))
+
+    def with_balances(self, as_of=None):
+        """
+        Annotates debit_sum, credit_sum, net_balance (debit - credit) and
+        parent_active, computed as Account.get_entry_sum does (carrying the
+        closing balances of the last closed period) within the same query.
+        """
+        periods = Period.objects.filter(closed=True)
+        sources = [Entry.objects.all()]
+        if as_of is not None:
+            periods = periods.filter(end__lte=as_of)
+            # Only dated balances may reach into archived periods.
+            sources.append(ArchivedEntry.objects.all())
+        last = periods.order_by("-end")
+        after = Coalesce(
+            Subquery(last.values("end")[:1]),
+            Value(date.min),
+            output_field=models.DateField(),
+        )
+        sources = [
+            entries.between(end=as_of).filter(booking__date__gt=after)
+            for entries in sources
+        ]
+        sources.append(
+            ClosingBalance.objects.filter(period=Subquery(last.values("pk")[:1]))
+        )
+        return (
+            self.with_active()
+            .annotate(
+                **{
+                    f"{column}_sum": functools.reduce(
+                        operator.add,
+                        (account_sum(source, column) for source in sources),
+                    )
+                    for column in ("debit", "credit")
+                },
+            )
+            .annotate(net_balance=F("debit_sum") - F("credit_sum"))
+        )
 
 
 class Account(CreatedModifiedModel, SlugifiedModel):
@@ -91,44 +368,461 @@ class Account(CreatedModifiedModel, SlugifiedModel):
     )
     virtual = models.BooleanField(default=False)
 
+    __parent_id = None
+    __virtual = None
+
+    objects = AccountQuerySet.as_manager()
+
     class Meta:
         unique_together = [["name", "parent"]]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__parent_id = self.parent_id
+        self.__virtual = self.virtual
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self.parent_id != self.__parent_id or self.virtual != self.__virtual:
+            invalidate_parents([self.__parent_id])
+            invalidate_accounts([self.pk])
+        self.mark_saved()
+
+    def mark_saved(self):
+        """Marks the parent and virtual flag as saved, e.g. after a bulk insert."""
+        self.__parent_id = self.parent_id
+        self.__virtual = self.virtual
+
     @property
     def active(self):
+        if hasattr(self, "parent_active"):
+            return self.parent_active
         return self.parent.active
 
     @property
     def debit(self):
-        return self.get_entry_sum("debit")
+        return self.get_balance("debit")
 
     @property
     def credit(self):
-        return self.get_entry_sum("credit")
+        return self.get_balance("credit")
 
-    def get_entry_sum(self, column):
-        value = Entry.objects.filter(account=self, virtual=self.virtual).aggregate(
-            Sum(column)
-        )[f"{column}__sum"]
+    def get_balance(self, column):
+        """
+        Returns the materialized balance of finalized bookings if the
+        KESHA_ACCOUNT_BALANCES setting is enabled, the sum of all entries otherwise.
+        """
+        if use_account_balances():
+            compute = functools.partial(AccountBalance.objects.get_sum, self)
+        else:
+            compute = self.get_entry_sum
+        return cached_balance(self, column, compute)
+
+    @instrument()
+    @reporting
+    def get_entry_sum(self, column, start=None, as_of=None):
+        return carried_sums(
+            Entry.objects.filter(account=self, virtual=self.virtual),
+            ClosingBalance.objects.filter(account=self, virtual=self.virtual),
+            start,
+            as_of,
+            archived=ArchivedEntry.objects.filter(account=self, virtual=self.virtual),
+        )[column]
+
+    async def aget_entry_sum(self, column, start=None, as_of=None):
+        return await to_async(self.get_entry_sum, concurrent=True)(column, start, as_of)
+
+    @reporting
+    def get_currency_sums(self, start=None, as_of=None):
+        """Returns debit and credit as Money per currency."""
+        return carried_sums(
+            Entry.objects.filter(account=self, virtual=self.virtual),
+            ClosingBalance.objects.filter(account=self, virtual=self.virtual),
+            start,
+            as_of,
+            by_currency=True,
+            archived=ArchivedEntry.objects.filter(account=self, virtual=self.virtual),
+        )
+
+
+class AccountBalanceManager(models.Manager):
+    def get_sum(self, account, column):
+        value = self.filter(account=account).values_list(column, flat=True).first()
         return value if value is not None else Decimal(0.0)
 
+    def entry_sums(self, entries):
+        """
+        Groups entries by account and sums them up, only counting entries whose
+        virtual flag matches the one of their account (as Account.get_entry_sum).
+        """
+        return (
+            entries.filter(virtual=F("account__virtual"))
+            .values("account")
+            .annotate(debit_sum=Sum("debit"), credit_sum=Sum("credit"))
+            .order_by()
+        )
+
+    def apply_booking(self, booking):
+        """Adds the entries of a finalized booking to the balances of their accounts."""
+        self.apply_entries(booking.entries.all())
+
+    def apply_entries(self, entries):
+        """Adds finalized entries to the balances of their accounts."""
+        for row in self.entry_sums(entries):
+            debit = row["debit_sum"] or Decimal(0.0)
+            credit = row["credit_sum"] or Decimal(0.0)
+            balance, _ = self.get_or_create(account_id=row["account"])
+            self.filter(pk=balance.pk).update(
+                debit=F("debit") + debit, credit=F("credit") + credit
+            )
+
+    @transaction.atomic
+    def rebuild(self):
+        """
+        Recomputes all balances from the entries of finalized bookings,
+        including the archived ones.
+        """
+        self.all().delete()
+        balances = {}
+        rows = chain(
+            self.entry_sums(Entry.objects.filter(booking__done=True)),
+            self.entry_sums(ArchivedEntry.objects.all()),
+        )
+        for row in rows:
+            balance = balances.setdefault(
+                row["account"], self.model(account_id=row["account"])
+            )
+            balance.debit += row["debit_sum"] or Decimal(0.0)
+            balance.credit += row["credit_sum"] or Decimal(0.0)
+        invalidate_accounts(Account.objects.values_list("pk", flat=True))
+        return self.bulk_create(balances.values())
+
+
+class AccountBalance(models.Model):
+    """Running totals of the finalized entries of an account."""
 
-class BookingManager(models.Manager):
-    def bulk_import(self, entries, account):
+    account = models.OneToOneField(
+        "Account",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="balance",
+    )
+    debit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    objects = AccountBalanceManager()
+
+
+class BookingQuerySet(models.QuerySet):
+    def as_of(self, date):
+        """Returns the bookings dated up to date (inclusive)."""
+        return self.filter(date__lte=date)
+
+    def between(self, start=None, end=None):
+        """Returns the bookings dated from start to end (both inclusive, if given)."""
+        bookings = self
+        if start is not None:
+            bookings = bookings.filter(date__gte=start)
+        if end is not None:
+            bookings = bookings.filter(date__lte=end)
+        return bookings
+
+    def open(self):
+        return self.filter(done=False)
+
+    def with_totals(self):
+        """
+        Annotates debit_total and credit_total of the non virtual entries and
+        their difference as imbalance, by one grouped aggregate.
+        """
+        non_virtual = Q(entries__virtual=False)
+        zero = Decimal(0.0)
+        return self.annotate(
+            debit_total=Coalesce(Sum("entries__debit", filter=non_virtual), zero),
+            credit_total=Coalesce(Sum("entries__credit", filter=non_virtual), zero),
+        ).annotate(imbalance=F("debit_total") - F("credit_total"))
+
+    def unbalanced(self):
+        """Returns the bookings whose entries do not balance, with their totals."""
+        return self.with_totals().exclude(imbalance=0)
+
+
+class BookingManager(models.Manager.from_queryset(BookingQuerySet)):
+    @instrument()
+    def finalize(self, queryset=None):
+        """
+        Marks all balanced bookings of queryset (all open bookings by default) as
+        done. The candidates are locked, their balances checked by one grouped
+        aggregate and the balanced ones updated by one UPDATE, within a single
+        transaction.
+        Raises ModelDoneError if queryset contains bookings which are done already.
+        :returns: The unbalanced bookings, which were left open
+        """
+        if queryset is None:
+            queryset = self.open()
+        with transaction.atomic(using=self.db):
+            # Locks the candidates before their balances are checked. Entry
+            # writes lock their bookings to check them, so none can be written
+            # to a candidate until it is updated.
+            list(queryset.select_for_update().values_list("pk", flat=True))
+            balanced, unbalanced = [], []
+            for booking in queryset.with_totals():
+                if booking.done:
+                    raise ModelDoneError()
+                if booking.imbalance == 0:
+                    balanced.append(booking.pk)
+                else:
+                    unbalanced.append(booking)
+            self.filter(pk__in=balanced).update(done=True, updated_at=timezone.now())
+            extend_chain(balanced)
+            invalidate_accounts(
+                Entry.objects.filter(booking__in=balanced).values_list(
+                    "account", flat=True
+                )
+            )
+            if use_account_balances():
+                AccountBalance.objects.apply_entries(
+                    Entry.objects.filter(booking__in=balanced)
+                )
+        return unbalanced
+
+    async def afinalize(self, queryset=None):
+        return await to_async(self.finalize)(queryset)
+
+    @instrument()
+    def bulk_import(self, entries, account, batch_size=1000):
         """
         Bulk imports entries and create a new booking for each entry.
-        ":param entries: Entries to be imported (list of dicts)
+        Rows are inserted in batches of batch_size within a single transaction.
+        ":param entries: Entries to be imported (iterable of dicts, "text" and
+            an optional "date" are used for the booking)
+        :returns: The created bookings (with primary keys)
         """
         bookings = []
-        for entry in entries:
-            booking = self.create()
-            booking.text = entry.pop("text")
-            entry["account"] = account
-            entry["booking"] = booking
-            entry = Entry.objects.create(**entry)
-            bookings.append(booking)
+        with transaction.atomic(using=self.db):
+            for chunk in chunked(entries, batch_size):
+                bookings += self._import_chunk(chunk, account)
         return bookings
 
+    async def abulk_import(self, entries, account, batch_size=1000):
+        return await to_async(self.bulk_import)(entries, account, batch_size)
+
+    def _import_chunk(self, entries, account):
+        bookings = [
+            self.model(**{key: entry[key] for key in BOOKING_KEYS if key in entry})
+            for entry in entries
+        ]
+        first = min(booking.date for booking in bookings)
+        if Period.objects.using(self.db).filter(closed=True, end__gte=first).exists():
+            raise ValidationError(
+                _(f"Bookings can not be dated into closed periods ({first}).")
+            )
+        connection = connections[self.db]
+        if connection.features.can_return_rows_from_bulk_insert:
+            bookings = self.bulk_create(bookings)
+        elif connection.vendor == "sqlite":
+            # SQLite serializes writing transactions, so the chunk got the
+            # highest primary keys, in the order of its rows.
+            self.bulk_create(bookings)
+            pks = self.using(self.db).order_by("-pk").values_list("pk", flat=True)
+            for booking, pk in zip(bookings, list(pks[: len(bookings)])[::-1]):
+                booking.pk = pk
+                booking._state.adding = False
+                booking._state.db = self.db
+        else:
+            for booking in bookings:
+                booking.save(using=self.db)
+        Entry.objects.db_manager(self.db).bulk_create(
+            Entry(
+                account=account,
+                booking=booking,
+                **{
+                    key: value
+                    for key, value in entry.items()
+                    if key not in BOOKING_KEYS
+                },
+            )
+            for entry, booking in zip(entries, bookings)
+        )
+        return bookings
+
+
+class PeriodManager(models.Manager):
+    def last_closed(self, as_of=None):
+        """Returns the last closed period, ending no later than as_of if given."""
+        periods = self.filter(closed=True)
+        if as_of is not None:
+            periods = periods.filter(end__lte=as_of)
+        return periods.order_by("-end").first()
+
+
+class Period(CreatedModifiedModel):
+    """A fiscal period (e.g. a year or a month) of bookings, ending at end."""
+
+    name = models.CharField(max_length=255)
+    start = models.DateField()
+    end = models.DateField()
+    closed = models.BooleanField(default=False)
+    archived = models.BooleanField(default=False)
+
+    objects = PeriodManager()
+
+    class Meta:
+        ordering = ["start"]
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def bookings(self):
+        return Booking.objects.between(self.start, self.end)
+
+    @transaction.atomic
+    def close(self):
+        """
+        Closes the period: finalizes all bookings up to its end and persists the
+        closing balances of all accounts, carried forward from the last closed period.
+        Raises a ValidationError if any of these bookings is unbalanced.
+        """
+        if self.closed:
+            raise ModelDoneError()
+        if self.end >= timezone.now().date():
+            raise ValidationError(_("Only periods which have ended can be closed."))
+        previous = Period.objects.last_closed()
+        if previous is not None and previous.end >= self.end:
+            raise ValidationError(
+                _("Periods have to be closed in chronological order.")
+            )
+        entries = Entry.objects.until(self)
+        if previous is not None:
+            entries = entries.after(previous)
+        unbalanced = Booking.objects.finalize(
+            Booking.objects.as_of(self.end).filter(done=False)
+        )
+        if unbalanced:
+            raise ValidationError(
+                _(f"{len(unbalanced)} bookings of {self} do not match up.")
+            )
+
+        balances = {}
+        rows = (
+            entries.annotate(currency=ENTRY_CURRENCY)
+            .values("account", "virtual", "currency")
+            .annotate(debit_sum=Sum("debit"), credit_sum=Sum("credit"))
+            .order_by()
+        )
+        if previous is not None:
+            rows = chain(
+                previous.closing_balances.values(
+                    "account",
+                    "virtual",
+                    "currency",
+                    debit_sum=F("debit"),
+                    credit_sum=F("credit"),
+                ),
+                rows,
+            )
+        for row in rows:
+            balance = balances.setdefault(
+                (row["account"], row["virtual"], row["currency"]),
+                ClosingBalance(
+                    period=self,
+                    account_id=row["account"],
+                    virtual=row["virtual"],
+                    currency=row["currency"],
+                ),
+            )
+            balance.debit += row["debit_sum"] or Decimal(0.0)
+            balance.credit += row["credit_sum"] or Decimal(0.0)
+        ClosingBalance.objects.bulk_create(balances.values())
+        self.closed = True
+        self.save()
+
+    def archive(self, batch_size=1000):
+        """
+        Moves the bookings of the closed period and their entries into the
+        archive tables, batch_size bookings per transaction. Bookings with
+        documents stay in place. Returns the number of archived bookings.
+        """
+        if not self.closed:
+            raise ValidationError(_("Only closed periods can be archived."))
+        archived = ArchivedBooking.objects.archive(
+            self.bookings.filter(done=True, documents=None), batch_size
+        )
+        self.archived = True
+        self.save()
+        return archived
+
+
+class ClosingBalanceQuerySet(models.QuerySet):
+    def sums(self):
+        return aggregate_sums(self)
+
+    def currency_sums(self):
+        return currency_sums(self.values("currency"))
+
+
+class ClosingBalance(models.Model):
+    """
+    Sums of an account's entries up to the end of a closed period, split by
+    the virtual flag and the currency of the entries.
+    """
+
+    period = models.ForeignKey(
+        "Period", on_delete=models.PROTECT, related_name="closing_balances"
+    )
+    account = models.ForeignKey(
+        "Account", on_delete=models.PROTECT, related_name="closing_balances"
+    )
+    virtual = models.BooleanField(default=False)
+    currency = models.CharField(max_length=3, default=DEFAULT_CURRENCY)
+    debit = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal(0))
+    credit = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal(0))
+
+    objects = ClosingBalanceQuerySet.as_manager()
+
+    class Meta:
+        unique_together = [["period", "account", "virtual", "currency"]]
+
+
+class ImportProgress(CreatedModifiedModel):
+    """Number of rows of an import source already committed to an account."""
+
+    source = models.CharField(max_length=255)
+    account = models.ForeignKey(
+        "Account", on_delete=models.CASCADE, related_name="imports"
+    )
+    rows = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [["source", "account"]]
+
+
+class ChainLink(models.Model):
+    """Link of the hash chain over finalized bookings, see kesha.chain."""
+
+    booking = models.OneToOneField(
+        "Booking",
+        on_delete=models.PROTECT,
+        null=True,
+        related_name="chain_link",
+    )
+    archived_booking = models.OneToOneField(
+        "ArchivedBooking",
+        on_delete=models.PROTECT,
+        null=True,
+        related_name="chain_link",
+    )
+    sequence = models.PositiveIntegerField(unique=True)
+    digest = models.CharField(max_length=64)
+
+
+class ChainCheckpoint(CreatedModifiedModel):
+    """Last link of the hash chain verified so far and its digest."""
+
+    sequence = models.PositiveIntegerField()
+    digest = models.CharField(max_length=64)
+
 
 class BookingDocument(models.Model):
     booking = models.ForeignKey(
@@ -146,6 +840,7 @@ class BookingDocument(models.Model):
 class Booking(CreatedModifiedModel):
     done = models.BooleanField(default=False)
     text = models.TextField()
+    date = models.DateField(default=date.today, db_index=True)
 
     __done = None
 
@@ -163,6 +858,7 @@ class Booking(CreatedModifiedModel):
     def credit(self):
         return self.get_entry_sum("credit")
 
+    @instrument()
     def get_entry_sum(self, column):
         value = Entry.objects.filter(booking=self, virtual=False).aggregate(
             Sum(column)
@@ -173,24 +869,138 @@ class Booking(CreatedModifiedModel):
     def entry_sums_match(self):
         return self.get_entry_sum("debit") == self.get_entry_sum("credit")
 
+    @instrument()
+    @on_primary
     def save(self, force_insert=False, force_update=False, *args, **kwargs):
-        if self.done and self.done == self.__done:
+        if self.__done:
             raise ModelDoneError()
-        elif self.done and self.done != self.__done:
+        if Period.objects.filter(closed=True, end__gte=self.date).exists():
+            raise ValidationError(
+                _(f"Bookings can not be dated into closed periods ({self.date}).")
+            )
+        if self.done:
             if not self.entry_sums_match:
                 self.done = False
                 raise ValidationError(
                     _(f"Entry sums do not match up Debit {self.debit} != {self.credit}")
                 )
             else:
-                super().save(force_insert, force_update, *args, **kwargs)
+                with transaction.atomic():
+                    super().save(force_insert, force_update, *args, **kwargs)
+                    extend_chain([self.pk])
+                    if use_account_balances():
+                        AccountBalance.objects.apply_booking(self)
+                    invalidate_accounts(self.entries.values_list("account", flat=True))
             self.__done = self.done
-        elif not self.done and self.done == self.__done:
+        else:
             super().save(force_insert, force_update, *args, **kwargs)
-            self.__done = self.done
-        elif not self.done and self.done != self.__done:
+
+
+class BaseEntryQuerySet(models.QuerySet):
+    """Aggregates and date filters of entries and archived entries."""
+
+    def sums(self):
+        return aggregate_sums(self)
+
+    def currency_sums(self):
+        return currency_sums(self.annotate(currency=ENTRY_CURRENCY).values("currency"))
+
+    def after(self, period):
+        """Returns the entries booked after the end of period."""
+        return self.filter(booking__date__gt=period.end)
+
+    def until(self, period):
+        """Returns the entries booked up to the end of period."""
+        return self.filter(booking__date__lte=period.end)
+
+    def between(self, start=None, end=None):
+        """Returns the entries booked from start to end (both inclusive, if given)."""
+        entries = self
+        if start is not None:
+            entries = entries.filter(booking__date__gte=start)
+        if end is not None:
+            entries = entries.filter(booking__date__lte=end)
+        return entries
+
+
+class EntryQuerySet(BaseEntryQuerySet):
+    """
+    Bulk writes and deletes which enforce the done lock of bookings with a
+    single query per batch, refusing the whole batch if any affected booking
+    is done.
+    """
+
+    def check_bookings_open(self, bookings):
+        """
+        Raises ModelDoneError if any booking matching the bookings Q is done.
+        Locks the bookings until the end of the calling transaction, so they
+        can not be finalized before the write.
+        """
+        done = (
+            Booking.objects.using(self.db)
+            .select_for_update()
+            .filter(bookings)
+            .order_by("pk")
+            .values_list("done", flat=True)
+        )
+        if any(done):
             raise ModelDoneError()
 
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            self.check_bookings_open(Q(pk__in={obj.booking_id for obj in objs}))
+            objs = super().bulk_create(objs, *args, **kwargs)
+            invalidate_accounts(obj.account_id for obj in objs)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        entries = self.filter(pk__in=[obj.pk for obj in objs])
+        with transaction.atomic(using=self.db):
+            self.check_bookings_open(
+                Q(pk__in={obj.booking_id for obj in objs})
+                | Q(pk__in=entries.values("booking"))
+            )
+            invalidate_accounts(entries.values_list("account", flat=True))
+            # Updates the batches through the base queryset, as they are checked.
+            rows = BaseEntryQuerySet(self.model, using=self.db).bulk_update(
+                objs, fields, *args, **kwargs
+            )
+            invalidate_accounts(obj.account_id for obj in objs)
+        return rows
+
+    def update(self, **kwargs):
+        bookings = Q(pk__in=self.values("booking"))
+        for key in ("booking", "booking_id"):
+            if key not in kwargs:
+                continue
+            booking = kwargs[key]
+            if isinstance(booking, models.Model):
+                booking = booking.pk
+            elif hasattr(booking, "resolve_expression"):
+                # The target bookings of expressions are only known afterwards.
+                raise ValueError("Entries can only be moved to a given booking.")
+            field = self.model._meta.get_field("booking").target_field
+            bookings |= Q(pk=field.to_python(booking))
+        with transaction.atomic(using=self.db):
+            self.check_bookings_open(bookings)
+            invalidate_accounts(self.values_list("account", flat=True))
+            rows = super().update(**kwargs)
+            account = kwargs.get("account", kwargs.get("account_id"))
+            invalidate_accounts([getattr(account, "pk", account)] if account else [])
+        return rows
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            self.check_bookings_open(Q(pk__in=self.values("booking")))
+            invalidate_accounts(self.values_list("account", flat=True))
+            return super().delete()
+
+
+class EntryManager(models.Manager.from_queryset(EntryQuerySet)):
+    pass
+
 
 class Entry(CreatedModifiedModel):
     account = models.ForeignKey(
@@ -200,14 +1010,39 @@ class Entry(CreatedModifiedModel):
         "Booking", on_delete=models.PROTECT, related_name="entries"
     )
     debit = MoneyField(
-        max_digits=14, decimal_places=2, default_currency="EUR", null=True, blank=True
+        max_digits=14,
+        decimal_places=2,
+        default_currency=DEFAULT_CURRENCY,
+        null=True,
+        blank=True,
     )
     credit = MoneyField(
-        max_digits=14, decimal_places=2, default_currency="EUR", null=True, blank=True
+        max_digits=14,
+        decimal_places=2,
+        default_currency=DEFAULT_CURRENCY,
+        null=True,
+        blank=True,
     )
     virtual = models.BooleanField(default=False)
 
+    __account_id = None
+
+    objects = EntryManager()
+
     class Meta:
+        # The amounts are part of the keys, so the hot aggregates per account
+        # (also used for parent subtrees, joining the bookings to skip closed
+        # periods) and per booking are covered by the index on every backend.
+        indexes = [
+            models.Index(
+                fields=["account", "virtual", "booking", "debit", "credit"],
+                name="kesha_entry_account_sums_idx",
+            ),
+            models.Index(
+                fields=["booking", "virtual", "debit", "credit"],
+                name="kesha_entry_booking_sums_idx",
+            ),
+        ]
         constraints = [
             models.CheckConstraint(
                 name="%(app_label)s_%(class)s_either_debit_or_credit",
@@ -218,12 +1053,119 @@ class Entry(CreatedModifiedModel):
             )
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__account_id = self.account_id
+
     def save(self, *args, **kwargs):
-        if self.done:
-            raise ModelDoneError()
-        else:
+        with transaction.atomic():
+            Entry.objects.check_bookings_open(Q(pk=self.booking_id))
             super().save(*args, **kwargs)
+            invalidate_accounts({self.account_id, self.__account_id} - {None})
+        self.__account_id = self.account_id
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            Entry.objects.check_bookings_open(Q(pk=self.booking_id))
+            invalidate_accounts([self.account_id])
+            return super().delete(*args, **kwargs)
 
     @property
     def done(self):
         return self.booking.done
+
+
+BOOKING_FIELDS = ("id", "created_at", "updated_at", "done", "text", "date")
+ENTRY_FIELDS = (
+    "id",
+    "created_at",
+    "updated_at",
+    "booking_id",
+    "account_id",
+    "virtual",
+    "debit",
+    "debit_currency",
+    "credit",
+    "credit_currency",
+)
+
+
+class ArchivedBookingManager(models.Manager.from_queryset(BookingQuerySet)):
+    def archive(self, bookings, batch_size=1000):
+        """
+        Moves bookings (a queryset of finalized bookings) with their entries
+        into the archive tables, keeping their primary keys and timestamps.
+        Every batch is moved in its own transaction.
+        Returns the number of archived bookings.
+        """
+        archived = 0
+        while True:
+            with transaction.atomic(using=self.db):
+                ids = list(
+                    bookings.order_by("pk").values_list("pk", flat=True)[:batch_size]
+                )
+                if not ids:
+                    return archived
+                self._archive_chunk(ids)
+            archived += len(ids)
+
+    def _archive_chunk(self, ids):
+        if Booking.objects.filter(pk__in=ids, done=False).exists():
+            raise ValidationError(_("Only finalized bookings can be archived."))
+        entries = Entry.objects.filter(booking__in=ids)
+        self.bulk_create(
+            self.model(**row)
+            for row in Booking.objects.filter(pk__in=ids).values(*BOOKING_FIELDS)
+        )
+        ArchivedEntry.objects.bulk_create(
+            ArchivedEntry(**row) for row in entries.values(*ENTRY_FIELDS)
+        )
+        ChainLink.objects.filter(booking__in=ids).update(
+            archived_booking=F("booking"), booking=None
+        )
+        # Bypasses the done lock of EntryQuerySet.delete, the entries are
+        # archived rather than removed.
+        models.QuerySet.delete(entries)
+        Booking.objects.filter(pk__in=ids).delete()
+
+
+class ArchivedBooking(models.Model):
+    """A finalized booking of a closed period, moved out of Booking."""
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    done = models.BooleanField(default=True)
+    text = models.TextField()
+    date = models.DateField(db_index=True)
+
+    objects = ArchivedBookingManager()
+
+
+class ArchivedEntry(models.Model):
+    """An entry of an ArchivedBooking."""
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    account = models.ForeignKey(
+        "Account", on_delete=models.PROTECT, related_name="archived_entries"
+    )
+    booking = models.ForeignKey(
+        "ArchivedBooking", on_delete=models.PROTECT, related_name="entries"
+    )
+    debit = MoneyField(
+        max_digits=14,
+        decimal_places=2,
+        default_currency=DEFAULT_CURRENCY,
+        null=True,
+        blank=True,
+    )
+    credit = MoneyField(
+        max_digits=14,
+        decimal_places=2,
+        default_currency=DEFAULT_CURRENCY,
+        null=True,
+        blank=True,
+    )
+    virtual = models.BooleanField(default=False)
+
+    objects = BaseEntryQuerySet.as_manager()
@@ -0,0 +1,131 @@
+"""
+Recomputation of account balances in chunks, spread over a process pool.
+
+Accounts are split into chunks of primary keys. Every chunk is summed up with
+one grouped query per worker process, each of which opens its own database
+connection, and the results are merged by the calling process.
+"""
+
+import django
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from django.apps import apps
+from django.db import connections, transaction
+from django.db.models import F, Sum
+from kesha.cache import invalidate_accounts
+from kesha.utils import chunked
+
+COLUMNS = ("debit", "credit")
+
+
+def account_chunks(accounts, chunk_size=500):
+    """Yields lists of at most chunk_size account ids of the accounts queryset."""
+    ids = accounts.order_by("pk").values_list("pk", flat=True)
+    yield from chunked(ids.iterator(chunk_size=chunk_size), chunk_size)
+
+
+def recompute_chunk(account_ids, as_of=None, finalized=False):
+    """
+    Returns debit and credit per account id, summed up as Account.get_entry_sum
+    does. With finalized, only entries of finalized (including archived)
+    bookings are counted and no closing balances are carried forward, as in
+    AccountBalance.
+    """
+    from kesha.models import ArchivedEntry, Entry, Period
+
+    sources = [
+        model.objects.filter(account__in=account_ids, virtual=F("account__virtual"))
+        for model in (Entry, ArchivedEntry)
+    ]
+    if finalized:
+        sources[0] = sources[0].filter(booking__done=True)
+    else:
+        if as_of is None:
+            # Undated sums never reach into archived periods.
+            sources.pop()
+        sources = [entries.between(end=as_of) for entries in sources]
+        period = Period.objects.last_closed(as_of)
+        if period is not None:
+            sources = [entries.after(period) for entries in sources]
+            sources.append(
+                period.closing_balances.filter(
+                    account__in=account_ids, virtual=F("account__virtual")
+                )
+            )
+    sums = {pk: dict.fromkeys(COLUMNS, Decimal(0.0)) for pk in account_ids}
+    for queryset in sources:
+        rows = (
+            queryset.values("account")
+            .annotate(debit_sum=Sum("debit"), credit_sum=Sum("credit"))
+            .order_by()
+        )
+        for row in rows:
+            for column in COLUMNS:
+                sums[row["account"]][column] += row[f"{column}_sum"] or Decimal(0.0)
+    return sums
+
+
+def materialize_chunk(account_ids):
+    """Replaces the AccountBalance rows of account_ids with recomputed ones."""
+    from kesha.models import AccountBalance
+
+    sums = recompute_chunk(account_ids, finalized=True)
+    with transaction.atomic():
+        AccountBalance.objects.filter(account__in=account_ids).delete()
+        AccountBalance.objects.bulk_create(
+            AccountBalance(account_id=pk, **columns) for pk, columns in sums.items()
+        )
+        invalidate_accounts(account_ids)
+    return sums
+
+
+def _init_worker():
+    # Spawned workers start without Django, forked ones must not share the
+    # connections of their parent.
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def _run_chunk(func, account_ids, kwargs):
+    try:
+        return func(account_ids, **kwargs)
+    finally:
+        connections.close_all()
+
+
+def recompute(accounts, workers=None, chunk_size=500, materialize=False, **kwargs):
+    """
+    Recomputes the balances of the accounts queryset chunk by chunk in a pool of
+    workers processes (all cores by default) and returns the merged sums per
+    account id. With a single worker or within a transaction, the chunks are
+    processed in this process. With materialize, the AccountBalance rows are
+    rebuilt as well.
+    """
+    func = materialize_chunk if materialize else recompute_chunk
+    workers = workers or os.cpu_count() or 1
+    chunks = account_chunks(accounts, chunk_size)
+    sums = {}
+    # Closing the connections for the pool would break the caller's
+    # transaction, whose writes the workers could not see anyway.
+    if workers == 1 or any(conn.in_atomic_block for conn in connections.all()):
+        for account_ids in chunks:
+            sums.update(func(account_ids, **kwargs))
+        return sums
+    chunks = list(chunks)
+    connections.close_all()
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as executor:
+        for result in executor.map(
+            _run_chunk,
+            [func] * len(chunks),
+            chunks,
+            [kwargs] * len(chunks),
+        ):
+            sums.update(result)
+    if materialize:
+        # The workers can only drop balances of a shared cache, not the
+        # process local one of this process.
+        invalidate_accounts(sums)
+    return sums
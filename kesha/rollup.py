@@ -0,0 +1,251 @@
+import functools
+import operator
+
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from itertools import chain
+from django.conf import settings
+from django.db import connection
+from django.db.models import DateField, DecimalField, F, Func, Subquery, Sum, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from djmoney.money import Money
+
+COLUMNS = ("debit", "credit")
+
+SUBTREE_SQL = """
+WITH RECURSIVE subtree(id) AS (
+    SELECT id FROM {table} WHERE id = %s
+    UNION ALL
+    SELECT child.id FROM {table} child INNER JOIN subtree ON child.parent_id = subtree.id
+)
+SELECT id FROM subtree
+"""
+
+
+def use_recursive_cte():
+    return getattr(settings, "KESHA_ROLLUP_RECURSIVE_CTE", True)
+
+
+def subtree_ids(parent):
+    """
+    Returns the ids of parent and all of its descendants.
+    Resolved by a recursive CTE (as a lazy subquery) or, if disabled through the
+    KESHA_ROLLUP_RECURSIVE_CTE setting, by walking the tree one level per query.
+    """
+    if use_recursive_cte():
+        table = connection.ops.quote_name(parent._meta.db_table)
+        return RawSQL(SUBTREE_SQL.format(table=table), [parent.pk])
+    model = type(parent)
+    ids = [parent.pk]
+    level = ids
+    while level:
+        level = list(
+            model._base_manager.filter(parent_id__in=level).values_list("pk", flat=True)
+        )
+        ids.extend(level)
+    return ids
+
+
+def add_sums(a, b):
+    """Adds two (possibly nested) dicts of sums, e.g. per currency and column."""
+    result = dict(a)
+    for key, value in b.items():
+        if key not in result:
+            result[key] = value
+        elif isinstance(value, dict):
+            result[key] = add_sums(result[key], value)
+        else:
+            result[key] = result[key] + value
+    return result
+
+
+def total(queryset, column):
+    """Returns the sum of column over queryset as a scalar subquery, zero if empty."""
+    sums = queryset.order_by().annotate(total=Func(F(column), function="SUM"))
+    return Coalesce(
+        Subquery(sums.values("total")[:1], output_field=DecimalField()),
+        Value(Decimal(0.0)),
+        output_field=DecimalField(),
+    )
+
+
+def carried_sums(
+    entries, balances, start=None, as_of=None, by_currency=False, archived=None
+):
+    """
+    Returns debit and credit of entries (as Money per currency if by_currency),
+    optionally limited to bookings dated from start and/or up to as_of.
+    Without start, the matching closing balances of the last closed period (up
+    to as_of) are carried forward and only the entries booked after it are
+    aggregated. Dated sums may reach into archived periods, so they include
+    the matching archived entries. The last closed period is resolved by
+    subqueries, so debit and credit are aggregated in a single query.
+    """
+    from kesha.models import Period
+
+    sources = [entries]
+    if archived is not None and (start is not None or as_of is not None):
+        sources.append(archived)
+    sources = [source.between(start, as_of) for source in sources]
+    if start is None:
+        periods = Period.objects.filter(closed=True)
+        if as_of is not None:
+            periods = periods.filter(end__lte=as_of)
+        last = periods.order_by("-end")
+        after = Coalesce(
+            Subquery(last.values("end")[:1]),
+            Value(date.min),
+            output_field=DateField(),
+        )
+        sources = [source.filter(booking__date__gt=after) for source in sources]
+        sources.append(balances.filter(period=Subquery(last.values("pk")[:1])))
+    if by_currency:
+        result = {}
+        for source in sources:
+            result = add_sums(result, source.currency_sums())
+        return result
+    first, *others = sources
+    sums = first.aggregate(
+        **{
+            column: functools.reduce(
+                operator.add,
+                [total(source, column) for source in others],
+                Coalesce(Sum(column), Value(Decimal(0.0)), output_field=DecimalField()),
+            )
+            for column in COLUMNS
+        }
+    )
+    return sums
+
+
+def subtree_sums(parent, start=None, as_of=None, by_currency=False):
+    """Returns debit and credit of all non virtual entries below parent."""
+    from kesha.models import ArchivedEntry, ClosingBalance, Entry
+
+    ids = subtree_ids(parent)
+    return carried_sums(
+        Entry.objects.filter(account__parent__in=ids, virtual=False),
+        ClosingBalance.objects.filter(account__parent__in=ids, virtual=False),
+        start,
+        as_of,
+        by_currency,
+        ArchivedEntry.objects.filter(account__parent__in=ids, virtual=False),
+    )
+
+
+@dataclass
+class TrialBalanceNode:
+    """
+    A Parent or Account of the trial balance with its precomputed sums, in
+    total and as Money per currency.
+    """
+
+    node: object
+    debit: Decimal = Decimal(0.0)
+    credit: Decimal = Decimal(0.0)
+    currencies: dict = field(default_factory=dict)
+    children: list = field(default_factory=list)
+
+    def add(self, debit, credit, currency):
+        self.debit += debit
+        self.credit += credit
+        self.currencies = add_sums(
+            self.currencies,
+            {
+                currency: {
+                    "debit": Money(debit, currency),
+                    "credit": Money(credit, currency),
+                }
+            },
+        )
+
+    @property
+    def balance(self):
+        return self.debit - self.credit
+
+
+def trial_balance(as_of=None):
+    """
+    Returns the root nodes of the whole Parent/Account tree with debit, credit
+    and balance of every node. Runs a constant number of queries, independent of
+    the tree size: parents, accounts and one aggregate over Entry grouped by
+    account and currency (plus the closing balances of the last closed period), which is then
+    folded up the tree in memory. Optionally limited to bookings up to as_of.
+    """
+    from kesha.models import (
+        ENTRY_CURRENCY,
+        Account,
+        ArchivedEntry,
+        ClosingBalance,
+        Entry,
+        Parent,
+        Period,
+    )
+
+    parents = {p.pk: TrialBalanceNode(p) for p in Parent.objects.all()}
+    accounts = {a.pk: TrialBalanceNode(a) for a in Account.objects.all()}
+    roots = []
+    for node in parents.values():
+        if node.node.parent_id is None:
+            roots.append(node)
+        else:
+            parent = parents[node.node.parent_id]
+            node.node.parent = parent.node
+            parent.children.append(node)
+    for node in accounts.values():
+        parent = parents[node.node.parent_id]
+        node.node.parent = parent.node
+        parent.children.append(node)
+
+    sources = [Entry.objects.all()]
+    if as_of is not None:
+        # Only dated trial balances may reach into archived periods.
+        sources.append(ArchivedEntry.objects.all())
+    sources = [entries.between(end=as_of) for entries in sources]
+    period = Period.objects.last_closed(as_of)
+    carried = ClosingBalance.objects.none()
+    if period is not None:
+        sources = [entries.after(period) for entries in sources]
+        carried = period.closing_balances.all()
+    sums = chain(
+        carried.values(
+            "account",
+            "virtual",
+            "currency",
+            debit_sum=F("debit"),
+            credit_sum=F("credit"),
+        ),
+        *(
+            entries.annotate(currency=ENTRY_CURRENCY)
+            .values("account", "virtual", "currency")
+            .annotate(debit_sum=Sum("debit"), credit_sum=Sum("credit"))
+            .order_by()
+            for entries in sources
+        ),
+    )
+    for row in sums:
+        account = accounts[row["account"]]
+        debit = row["debit_sum"] or Decimal(0.0)
+        credit = row["credit_sum"] or Decimal(0.0)
+        # Accounts sum up entries matching their own virtual flag,
+        # parents only ever count non virtual entries.
+        if row["virtual"] == account.node.virtual:
+            account.add(debit, credit, row["currency"])
+        if not row["virtual"]:
+            parents[account.node.parent_id].add(debit, credit, row["currency"])
+
+    # Fold parent sums up the tree, children before their parents.
+    order, stack = [], list(roots)
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(c for c in node.children if isinstance(c.node, Parent))
+    for node in reversed(order):
+        if node.node.parent_id is not None:
+            parent = parents[node.node.parent_id]
+            parent.debit += node.debit
+            parent.credit += node.credit
+            parent.currencies = add_sums(parent.currencies, node.currencies)
+    return roots
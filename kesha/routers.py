@@ -0,0 +1,121 @@
+"""
+Routing of kesha's reporting reads to a read replica.
+
+Add KeshaRouter to DATABASE_ROUTERS and name the replica in the
+KESHA_READ_DATABASE setting. The reporting operations (balances of parents
+and accounts, trial balances and journal exports) then read from the replica,
+as does everything within a reporting_reads block:
+
+    with reporting_reads():
+        accounts = list(Account.objects.with_balances())
+
+All writes, all reads within transactions and the checks of Booking.save stay
+on the primary (the default database).
+"""
+
+import functools
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY = object()
+
+_reads = ContextVar("kesha_reads", default=None)
+
+
+def read_database():
+    return getattr(settings, "KESHA_READ_DATABASE", None)
+
+
+def read_alias():
+    """Returns the alias kesha reads are currently routed to, None for the default."""
+    alias = _reads.get()
+    if alias is None or alias is PRIMARY:
+        return None
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        # Reads within a transaction have to see its writes.
+        return None
+    return alias
+
+
+def reporting_alias():
+    """
+    Returns the alias a reporting operation called now reads from, for lazy
+    operations (like generators) which query after they have returned.
+    """
+    if _reads.get() is None and read_database() is not None:
+        with reporting_reads():
+            return read_alias()
+    return read_alias()
+
+
+@contextmanager
+def reporting_reads(alias=None):
+    """Routes kesha reads within the block to alias (KESHA_READ_DATABASE by default)."""
+    token = _reads.set(alias or read_database())
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Keeps kesha reads within the block on the primary, even in reporting blocks."""
+    token = _reads.set(PRIMARY)
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+def reporting(func):
+    """Runs the decorated reporting operation in a reporting_reads block."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _reads.get() is not None or read_database() is None:
+            return func(*args, **kwargs)
+        with reporting_reads():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def on_primary(func):
+    """Runs the decorated operation in a primary_reads block."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with primary_reads():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class KeshaRouter:
+    def is_kesha(self, model):
+        return model._meta.app_label == "kesha"
+
+    def db_for_read(self, model, **hints):
+        if not self.is_kesha(model):
+            return None
+        alias = read_alias()
+        if alias is None and read_database() is not None:
+            # Keeps instances read from the replica from routing their relations there.
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Instances read from the replica must still be written to the primary.
+        if self.is_kesha(model) and read_database() is not None:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, read_database()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
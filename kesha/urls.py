@@ -0,0 +1,8 @@
+from django.urls import path
+from kesha import views
+
+app_name = "kesha"
+
+urlpatterns = [
+    path("journal.<str:format>", views.journal_export, name="journal_export"),
+]
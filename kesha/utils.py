@@ -0,0 +1,46 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections
+from itertools import islice
+
+
+def chunked(iterable, size):
+    """Yields lists of at most size items from iterable, without materializing it."""
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def use_concurrent_queries():
+    return getattr(
+        settings, "KESHA_ASYNC_CONCURRENT_QUERIES", connection.vendor != "sqlite"
+    )
+
+
+def closing_connections(func):
+    """Closes the database connections of the calling thread after func."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+
+    return wrapper
+
+
+def to_async(func, concurrent=False):
+    """
+    Wraps the database bound func for async callers. Read only funcs may run
+    concurrently, each in its own thread and connection, if the backend allows
+    it (setting KESHA_ASYNC_CONCURRENT_QUERIES, off for SQLite by default);
+    all others run in the shared, thread sensitive executor.
+    """
+    if concurrent and use_concurrent_queries():
+        return sync_to_async(closing_connections(func), thread_sensitive=False)
+    return sync_to_async(func)
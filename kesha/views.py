@@ -0,0 +1,32 @@
+from datetime import date
+from django.contrib.auth.decorators import permission_required
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from kesha.exporters import WRITERS, export_journal
+from kesha.models import ArchivedEntry, Entry
+
+
+@permission_required("kesha.view_entry", raise_exception=True)
+def journal_export(request, format):
+    """
+    Streams the journal as CSV or JSON lines, optionally limited to the
+    bookings dated between the start and end query parameters. With the
+    archived query parameter set to 1, true or yes, the archived journal is
+    streamed instead.
+    """
+    if format not in WRITERS:
+        raise Http404(f"Unsupported export format: {format}")
+    try:
+        start, end = (
+            date.fromisoformat(request.GET[key]) if request.GET.get(key) else None
+            for key in ("start", "end")
+        )
+    except ValueError:
+        return HttpResponseBadRequest("start and end must be ISO dates.")
+    archived = request.GET.get("archived", "").lower() in ("1", "true", "yes")
+    entries = ArchivedEntry.objects if archived else Entry.objects
+    response = StreamingHttpResponse(
+        export_journal(format, entries.between(start, end)),
+        content_type=WRITERS[format][1],
+    )
+    response["Content-Disposition"] = f'attachment; filename="journal.{format}"'
+    return response
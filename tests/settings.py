@@ -1,6 +1,11 @@
+import os
+import tempfile
+
 USE_TZ = False
 SECRET_KEY = "fake_key_for_testing"
 INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
     "djmoney",
     "doma",
     "kesha",
@@ -10,5 +15,19 @@ DATABASES = dict(
     default=dict(
         ENGINE="django.db.backends.sqlite3",
         NAME=":memory:",
-    )
+        # File backed, so the worker processes of kesha.recompute share it
+        # (see tests/test_recompute.py), and named per process, so parallel
+        # test runs don't.
+        TEST=dict(
+            NAME=os.path.join(
+                tempfile.gettempdir(), f"kesha_test_{os.getpid()}.sqlite3"
+            )
+        ),
+    ),
+    # Stands in for a read replica, see tests/test_routers.py.
+    replica=dict(
+        ENGINE="django.db.backends.sqlite3",
+        NAME=":memory:",
+    ),
 )
+DATABASE_ROUTERS = ["kesha.routers.KeshaRouter"]
@@ -0,0 +1,64 @@
+from datetime import date
+from decimal import Decimal
+from django.db import models
+from django.test import TestCase
+from djmoney.money import Money
+from kesha.models import Account, Booking, Entry, Period
+from tests.factories import ActiveAccountFactory, PassiveParentFactory
+
+
+class WithBalancesTestCase(TestCase):
+    def setUp(self):
+        self.debit = ActiveAccountFactory()
+        self.credit = ActiveAccountFactory(parent=PassiveParentFactory())
+        self.virtual = ActiveAccountFactory(virtual=True)
+        self.period = Period.objects.create(
+            name="2020", start=date(2020, 1, 1), end=date(2020, 12, 31)
+        )
+        for day in [date(2020, 5, 1), date(2021, 5, 1)]:
+            b = Booking.objects.create(text=f"Booking {day}", date=day)
+            Entry.objects.create(account=self.debit, booking=b, debit=Money(100, "EUR"))
+            Entry.objects.create(
+                account=self.credit, booking=b, credit=Money(100, "EUR")
+            )
+            # Virtual entries only count for virtual accounts.
+            Entry.objects.create(
+                account=self.debit, booking=b, credit=Money(30, "EUR"), virtual=True
+            )
+            Entry.objects.create(
+                account=self.virtual, booking=b, debit=Money(30, "EUR"), virtual=True
+            )
+
+    def assertBalances(self, as_of=None):
+        with self.assertNumQueries(1):
+            accounts = list(Account.objects.with_balances(as_of).order_by("pk"))
+        self.assertEqual(len(accounts), 3)
+        for account in accounts:
+            debit = account.get_entry_sum("debit", as_of=as_of)
+            credit = account.get_entry_sum("credit", as_of=as_of)
+            self.assertEqual(account.debit_sum, debit)
+            self.assertEqual(account.credit_sum, credit)
+            self.assertEqual(account.net_balance, debit - credit)
+        return accounts
+
+    def test_with_balances(self):
+        debit, credit, virtual = self.assertBalances()
+        self.assertEqual(debit.debit_sum, Decimal("200.00"))
+        self.assertEqual(virtual.debit_sum, Decimal("60.00"))
+        self.assertEqual(credit.net_balance, Decimal("-200.00"))
+        self.assertTrue(debit.active)
+        self.assertFalse(credit.active)
+
+    def test_with_balances_closed_period(self):
+        self.period.close()
+        # Entries up to the closed period are carried by its closing balances.
+        models.QuerySet.delete(Entry.objects.filter(booking__date__year=2020))
+        debit, _, virtual = self.assertBalances()
+        self.assertEqual(debit.debit_sum, Decimal("200.00"))
+        self.assertEqual(virtual.debit_sum, Decimal("60.00"))
+        self.assertBalances(as_of=date(2020, 12, 31))
+        self.assertBalances(as_of=date(2020, 6, 1))
+
+    def test_with_balances_filtered(self):
+        accounts = Account.objects.with_balances().filter(debit_sum__gt=0)
+        self.assertCountEqual(accounts, [self.debit, self.virtual])
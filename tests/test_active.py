@@ -0,0 +1,56 @@
+from django.test import TestCase
+from kesha.models import Account, Parent
+from tests.factories import (
+    ActiveAccountFactory,
+    ActiveParentFactory,
+    PassiveParentFactory,
+)
+
+
+class ActivePropagationTestCase(TestCase):
+    def setUp(self):
+        self.root = ActiveParentFactory()
+        self.child = ActiveParentFactory(parent=self.root)
+        self.grandchild = ActiveParentFactory(parent=self.child)
+        self.other = ActiveParentFactory()
+        for parent in (self.root, self.child, self.grandchild):
+            ActiveAccountFactory(parent=parent)
+
+    def assertActive(self, *parents, active=True):
+        for parent in parents:
+            parent.refresh_from_db()
+            self.assertEqual(parent.active, active, parent)
+
+    def test_set_active(self):
+        # Savepoints, the root ids and the update of the subtree.
+        with self.assertNumQueries(4):
+            self.root.set_active(False)
+        self.assertFalse(self.root.active)
+        self.assertActive(self.root, self.child, self.grandchild, active=False)
+        self.assertActive(self.other)
+
+    def test_set_active_queryset(self):
+        updated = Parent.objects.filter(
+            pk__in=[self.child.pk, self.other.pk]
+        ).set_active(False)
+        self.assertEqual(updated, 3)
+        self.assertActive(self.child, self.grandchild, self.other, active=False)
+        self.assertActive(self.root)
+
+    def test_save_propagates(self):
+        self.root.active = False
+        self.root.save()
+        self.assertActive(self.child, self.grandchild, active=False)
+
+    def test_move_propagates(self):
+        passive = PassiveParentFactory()
+        self.child.parent = passive
+        self.child.save()
+        self.assertActive(self.child, self.grandchild, active=False)
+        self.assertActive(self.root)
+
+    def test_account_active_in_bulk(self):
+        self.root.set_active(False)
+        with self.assertNumQueries(1):
+            accounts = list(Account.objects.with_active())
+            self.assertFalse(any(account.active for account in accounts))
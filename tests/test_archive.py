@@ -0,0 +1,109 @@
+import json
+
+from datetime import date
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from djmoney.money import Money
+from kesha.chain import ChainError, verify_chain
+from kesha.exporters import export_journal
+from kesha.models import (
+    Account,
+    AccountBalance,
+    ArchivedBooking,
+    ArchivedEntry,
+    Booking,
+    Entry,
+    Parent,
+    Period,
+)
+from tests.factories import ActiveAccountFactory, ActiveParentFactory
+
+DATES = [date(2020, 3, 1), date(2020, 5, 1), date(2021, 5, 1), date.today()]
+
+
+@override_settings(KESHA_HASH_CHAIN=True)
+class ArchiveTestCase(TestCase):
+    def setUp(self):
+        self.p = ActiveParentFactory()
+        self.debit = ActiveAccountFactory(parent=self.p)
+        self.credit = ActiveAccountFactory(parent=self.p)
+        self.y2020 = Period.objects.create(
+            name="2020", start=date(2020, 1, 1), end=date(2020, 12, 31)
+        )
+        self.y2021 = Period.objects.create(
+            name="2021", start=date(2021, 1, 1), end=date(2021, 12, 31)
+        )
+        for day in DATES:
+            b = Booking.objects.create(text=f"Booking {day}", date=day)
+            Entry.objects.create(account=self.debit, booking=b, debit=Money(100, "EUR"))
+            Entry.objects.create(
+                account=self.credit, booking=b, credit=Money(100, "EUR")
+            )
+        self.y2020.close()
+        self.y2021.close()
+
+    def reports(self):
+        """Balances which have to survive archiving."""
+        windows = [
+            {},
+            {"as_of": date(2020, 4, 1)},
+            {"as_of": date(2021, 6, 30)},
+            {"start": date(2020, 4, 1), "as_of": date(2021, 12, 31)},
+        ]
+        (root,) = [
+            n
+            for n in Parent.objects.trial_balance(date(2021, 6, 30))
+            if n.node == self.p
+        ]
+        return (
+            [self.debit.get_entry_sum("debit", **window) for window in windows],
+            [self.p.get_sums(**window) for window in windows],
+            self.credit.get_currency_sums(as_of=date(2021, 6, 30)),
+            root.debit,
+            [
+                a.debit_sum
+                for a in Account.objects.with_balances(date(2020, 4, 1)).order_by("pk")
+            ],
+        )
+
+    def test_archive(self):
+        reports = self.reports()
+        self.assertEqual(self.y2020.archive(batch_size=1), 2)
+        self.assertEqual(self.y2021.archive(), 1)
+        self.assertTrue(Period.objects.get(pk=self.y2020.pk).archived)
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(Entry.objects.count(), 2)
+        self.assertEqual(ArchivedEntry.objects.count(), 6)
+        self.assertEqual(
+            sorted(ArchivedBooking.objects.values_list("date", flat=True)), DATES[:3]
+        )
+        self.assertEqual(self.reports(), reports)
+        self.assertEqual(self.debit.debit, Decimal("400.00"))
+
+    def test_archive_open_period(self):
+        period = Period.objects.create(
+            name="2022", start=date(2022, 1, 1), end=date(2022, 12, 31)
+        )
+        self.assertRaises(ValidationError, period.archive)
+
+    def test_audit_queries(self):
+        self.y2020.archive()
+        entries = ArchivedEntry.objects.between(date(2020, 4, 1), date(2020, 12, 31))
+        self.assertEqual(entries.sums()["debit"], Decimal("100.00"))
+        self.assertFalse(ArchivedBooking.objects.unbalanced().exists())
+        rows = [json.loads(line) for line in export_journal("jsonl", entries)]
+        self.assertEqual([row["date"] for row in rows], ["2020-05-01"] * 2)
+
+    def test_rebuild_balances(self):
+        self.y2020.archive()
+        AccountBalance.objects.rebuild()
+        self.assertEqual(
+            AccountBalance.objects.get(account=self.debit).debit, Decimal("300.00")
+        )
+
+    def test_chain(self):
+        self.y2020.archive()
+        self.assertEqual(verify_chain(full=True), 3)
+        ArchivedEntry.objects.filter(account=self.debit).update(virtual=True)
+        self.assertRaises(ChainError, verify_chain, full=True)
@@ -0,0 +1,67 @@
+from decimal import Decimal
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from djmoney.money import Money
+from kesha.models import Booking, Parent
+from tests.factories import ActiveAccountFactory, ActiveParentFactory, BookingFactory
+
+
+class AsyncTestCase(TestCase):
+    def setUp(self):
+        self.root = ActiveParentFactory()
+        self.left = ActiveParentFactory(parent=self.root)
+        self.right = ActiveParentFactory(parent=self.root)
+        self.b = BookingFactory(good=True)
+        for entry, parent in zip(self.b.entries.all(), [self.left, self.right]):
+            entry.account.parent = parent
+            entry.account.save()
+        self.account = self.b.entries.first().account
+
+    async def test_account_sum(self):
+        self.assertEqual(
+            await self.account.aget_entry_sum("debit"),
+            await sync_to_async(self.account.get_entry_sum)("debit"),
+        )
+
+    async def test_parent_sums(self):
+        self.assertEqual(await self.root.aget_sum("debit"), Decimal("100.00"))
+        sums = await self.root.aget_child_sums()
+        self.assertEqual(sums[self.left.pk]["debit"], Decimal("100.00"))
+        self.assertEqual(sums[self.right.pk]["credit"], Decimal("100.00"))
+
+    async def test_parent_sums_concurrent_setting(self):
+        for concurrent in (False, True):
+            calls = []
+
+            def spy(func, thread_sensitive=True):
+                calls.append(thread_sensitive)
+                if not thread_sensitive:
+                    # SQLite test databases are not shared between threads, so
+                    # the func without closing_connections runs in this one.
+                    func = func.__wrapped__
+                return sync_to_async(func)
+
+            with override_settings(KESHA_ASYNC_CONCURRENT_QUERIES=concurrent):
+                with mock.patch("kesha.utils.sync_to_async", spy):
+                    sums = await Parent.objects.aget_sums([self.left, self.right])
+            self.assertEqual(calls, [not concurrent] * 2)
+            self.assertEqual(sums[self.left.pk]["debit"], Decimal("100.00"))
+
+    async def test_trial_balance(self):
+        roots = await Parent.objects.atrial_balance()
+        (root,) = [node for node in roots if node.node == self.root]
+        self.assertEqual(root.debit, Decimal("100.00"))
+
+    async def test_bulk_import_and_finalize(self):
+        account = await sync_to_async(ActiveAccountFactory)()
+        entries = [
+            {"text": "a", "debit": Money(5, "EUR")},
+            {"text": "b", "credit": Money(5, "EUR")},
+        ]
+        bookings = await Booking.objects.abulk_import(entries, account)
+        self.assertEqual(len(bookings), 2)
+        unbalanced = await Booking.objects.afinalize(
+            Booking.objects.filter(pk__in=[b.pk for b in bookings])
+        )
+        self.assertEqual(await sync_to_async(len)(unbalanced), 2)
@@ -0,0 +1,64 @@
+from io import StringIO
+from decimal import Decimal
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from djmoney.money import Money
+from kesha.models import AccountBalance, Entry
+from tests.factories import ActiveAccountFactory, BookingFactory
+
+
+@override_settings(KESHA_ACCOUNT_BALANCES=True)
+class AccountBalanceTestCase(TestCase):
+    def setUp(self):
+        self.b = BookingFactory(good=True)
+        self.debit_account = self.b.entries.get(credit=None).account
+        self.credit_account = self.b.entries.get(debit=None).account
+
+    def test_balance_on_done(self):
+        self.assertEqual(self.debit_account.debit, Decimal("0.0"))
+        self.b.done = True
+        self.b.save()
+        self.assertEqual(self.debit_account.debit, Decimal("100.00"))
+        self.assertEqual(self.credit_account.credit, Decimal("100.00"))
+        with self.assertNumQueries(1):
+            self.debit_account.credit
+
+    def test_balance_is_incremented(self):
+        self.b.done = True
+        self.b.save()
+        b = BookingFactory(good=True)
+        b.entries.filter(credit=None).update(account=self.debit_account)
+        b.done = True
+        b.save()
+        self.assertEqual(self.debit_account.debit, Decimal("200.00"))
+
+    def test_virtual_entries_follow_account(self):
+        Entry.objects.create(
+            account=self.credit_account,
+            booking=self.b,
+            credit=Money(50.00, "EUR"),
+            virtual=True,
+        )
+        virtual_account = ActiveAccountFactory(virtual=True)
+        Entry.objects.create(
+            account=virtual_account,
+            booking=self.b,
+            debit=Money(50.00, "EUR"),
+            virtual=True,
+        )
+        self.b.done = True
+        self.b.save()
+        self.assertEqual(self.credit_account.credit, Decimal("100.00"))
+        self.assertEqual(virtual_account.debit, Decimal("50.00"))
+
+    def test_rebuild(self):
+        self.b.done = True
+        self.b.save()
+        BookingFactory(good=True)
+        AccountBalance.objects.all().update(debit=0, credit=0)
+        call_command("kesha_rebuild_balances", stdout=StringIO())
+        self.assertEqual(AccountBalance.objects.count(), 2)
+        self.assertEqual(self.debit_account.debit, Decimal("100.00"))
+        self.assertEqual(
+            self.debit_account.debit, self.debit_account.get_entry_sum("debit")
+        )
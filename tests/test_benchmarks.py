@@ -0,0 +1,27 @@
+from django.test import TestCase
+from benchmarks.ledger import generate_ledger
+from kesha.models import Account, Booking, Entry, Parent
+
+
+class LedgerGeneratorTestCase(TestCase):
+    def test_generate_ledger(self):
+        counts = generate_ledger(
+            depth=2, width=3, accounts=5, entries_per_account=4, seed=1
+        )
+        self.assertEqual(
+            counts, {"parents": 12, "accounts": 5, "bookings": 10, "entries": 20}
+        )
+        self.assertEqual(Parent.objects.count(), 12)
+        self.assertEqual(Account.objects.count(), 5)
+        self.assertEqual(Entry.objects.count(), 20)
+        for account in Account.objects.all():
+            self.assertEqual(account.entries.count(), 4)
+        self.assertEqual(Booking.objects.finalize(), [])
+        roots = Parent.objects.get_roots()
+        self.assertEqual(len(roots), 3)
+        self.assertEqual(roots.descendants().count(), 12)
+        self.assertEqual(roots.accounts_under().count(), 5)
+        self.assertEqual(
+            sum(root.debit for root in roots), sum(root.credit for root in roots)
+        )
+        Parent.objects.create(name="New", active=True)
@@ -1,8 +1,9 @@
 import yaml
 
 from djmoney.money import Money
+from django.db.utils import IntegrityError
 from django.test import TestCase
-from kesha.models import Booking
+from kesha.models import Booking, Entry
 from tests.factories import ActiveParentFactory, ActiveAccountFactory
 from pathlib import Path
 
@@ -23,7 +24,7 @@ class BulkImportTestCase(TestCase):
     def test_bulk_import(self):
         entries = get_entries()
         entry_texts = [entry["text"] for entry in entries]
-        bookings = Booking.objects.bulk_import(entries, self.a)
+        bookings = Booking.objects.bulk_import(entries, self.a, batch_size=2)
         self.assertEqual(len(entries), len(bookings))
         for entry, booking, entry_text in zip(entries, bookings, entry_texts):
             self.assertEqual(len(booking.entries.all()), 1)
@@ -33,3 +34,24 @@ class BulkImportTestCase(TestCase):
                 self.assertEqual(Money(entry["debit"], CUR), b_entry.debit)
             else:
                 self.assertEqual(Money(entry["credit"], CUR), b_entry.credit)
+
+    def test_bulk_import_persists_text(self):
+        entries = get_entries()
+        bookings = Booking.objects.bulk_import(entries, self.a)
+        for entry, booking in zip(entries, bookings):
+            self.assertEqual(Booking.objects.get(pk=booking.pk).text, entry["text"])
+        self.assertEqual(Entry.objects.filter(account=self.a).count(), len(entries))
+
+    def test_bulk_import_saved_state(self):
+        bookings = Booking.objects.bulk_import(get_entries(), self.a)
+        bookings[0].text = "Changed"
+        bookings[0].save()
+        self.assertEqual(Booking.objects.count(), len(bookings))
+        self.assertEqual(Booking.objects.get(pk=bookings[0].pk).text, "Changed")
+
+    def test_bulk_import_is_atomic(self):
+        entries = get_entries() + [{"text": "Broken", "debit": 1, "credit": 1}]
+        with self.assertRaises(IntegrityError):
+            Booking.objects.bulk_import(entries, self.a, batch_size=2)
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(Entry.objects.exists())
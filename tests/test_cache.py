@@ -0,0 +1,117 @@
+from decimal import Decimal
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from djmoney.money import Money
+from kesha.cache import get_cache
+from kesha.models import Account, AccountBalance, Booking, Entry
+from kesha.recompute import recompute
+from tests.factories import ActiveAccountFactory, ActiveParentFactory, BookingFactory
+
+
+@override_settings(KESHA_BALANCE_CACHE=True)
+class BalanceCacheTestCase(TransactionTestCase):
+    # Balances are invalidated on commit, which TestCase never does.
+    def setUp(self):
+        get_cache().clear()
+        self.root = ActiveParentFactory()
+        self.parent = ActiveParentFactory(parent=self.root)
+        self.account = ActiveAccountFactory(parent=self.parent)
+        self.b = BookingFactory(good=True)
+        self.b.entries.filter(credit=None).update(account=self.account)
+
+    def assertBalances(self, debit):
+        for obj in [self.account, self.parent, self.root]:
+            self.assertEqual(obj.debit, debit)
+
+    def test_cached(self):
+        self.assertBalances(Decimal("100.00"))
+        with self.assertNumQueries(0):
+            self.assertBalances(Decimal("100.00"))
+
+    def test_entry_save(self):
+        self.assertBalances(Decimal("100.00"))
+        entry = Entry(account=self.account, booking=self.b, debit=Money(50, "EUR"))
+        entry.save()
+        self.assertBalances(Decimal("150.00"))
+        entry.account = ActiveAccountFactory()
+        entry.save()
+        self.assertBalances(Decimal("100.00"))
+        self.assertEqual(entry.account.debit, Decimal("50.00"))
+        entry.delete()
+        self.assertEqual(entry.account.debit, Decimal("0.00"))
+
+    def test_bulk_writes(self):
+        self.assertBalances(Decimal("100.00"))
+        Entry.objects.bulk_create(
+            [Entry(account=self.account, booking=self.b, debit=Money(50, "EUR"))]
+        )
+        self.assertBalances(Decimal("150.00"))
+        self.account.entries.filter(debit=Money(50, "EUR")).update(
+            debit=Money(10, "EUR")
+        )
+        self.assertBalances(Decimal("110.00"))
+        entry = self.account.entries.get(debit=Money(10, "EUR"))
+        entry.debit = Money(20, "EUR")
+        Entry.objects.bulk_update([entry], ["debit"])
+        self.assertBalances(Decimal("120.00"))
+        self.account.entries.filter(pk=entry.pk).delete()
+        self.assertBalances(Decimal("100.00"))
+
+    @override_settings(KESHA_ACCOUNT_BALANCES=True)
+    def test_finalization(self):
+        self.assertEqual(self.account.debit, Decimal("0.00"))
+        self.b.done = True
+        self.b.save()
+        self.assertEqual(self.account.debit, Decimal("100.00"))
+        b = BookingFactory(good=True)
+        b.entries.filter(credit=None).update(account=self.account)
+        self.assertEqual(self.account.debit, Decimal("100.00"))
+        Booking.objects.finalize()
+        self.assertEqual(self.account.debit, Decimal("200.00"))
+
+    @override_settings(KESHA_ACCOUNT_BALANCES=True)
+    def test_rebuild(self):
+        self.b.done = True
+        self.b.save()
+        for rebuild in (
+            AccountBalance.objects.rebuild,
+            lambda: recompute(Account.objects.all(), workers=1, materialize=True),
+        ):
+            AccountBalance.objects.filter(account=self.account).update(debit=999)
+            get_cache().clear()
+            self.assertEqual(self.account.debit, Decimal("999.00"))
+            rebuild()
+            self.assertEqual(self.account.debit, Decimal("100.00"))
+
+    def test_reparent(self):
+        other = ActiveParentFactory()
+        self.assertBalances(Decimal("100.00"))
+        self.assertEqual(other.debit, Decimal("0.00"))
+        self.parent.parent = other
+        self.parent.save()
+        self.assertEqual(self.root.debit, Decimal("0.00"))
+        self.assertEqual(other.debit, Decimal("100.00"))
+        self.account.parent = other
+        self.account.save()
+        self.assertEqual(self.parent.debit, Decimal("0.00"))
+        self.assertEqual(other.debit, Decimal("100.00"))
+        self.account.virtual = True
+        self.account.save()
+        self.assertBalances(Decimal("0.00"))
+
+    def test_invalidated_on_commit(self):
+        self.assertBalances(Decimal("100.00"))
+        entry = Entry(account=self.account, booking=self.b, debit=Money(50, "EUR"))
+        with transaction.atomic():
+            entry.save()
+            with self.assertNumQueries(0):
+                self.assertBalances(Decimal("100.00"))
+        self.assertBalances(Decimal("150.00"))
+        try:
+            with transaction.atomic():
+                Entry.objects.filter(pk=entry.pk).delete()
+                raise ValueError()
+        except ValueError:
+            pass
+        with self.assertNumQueries(0):
+            self.assertBalances(Decimal("150.00"))
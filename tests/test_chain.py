@@ -0,0 +1,77 @@
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import models
+from django.test import TestCase, override_settings
+from kesha.chain import ChainError, chain_unlinked, verify_chain
+from kesha.models import Booking, ChainCheckpoint, ChainLink, Entry
+from tests.factories import BookingFactory
+
+
+@override_settings(KESHA_HASH_CHAIN=True)
+class HashChainTestCase(TestCase):
+    def setUp(self):
+        self.bookings = [BookingFactory(good=True) for _ in range(4)]
+        self.bookings[0].done = True
+        self.bookings[0].save()
+        Booking.objects.finalize()
+
+    def test_extend(self):
+        links = list(ChainLink.objects.order_by("sequence"))
+        self.assertEqual([link.sequence for link in links], [1, 2, 3, 4])
+        self.assertEqual([link.booking for link in links], self.bookings)
+        self.assertEqual(len({link.digest for link in links}), 4)
+
+    def test_extend_constant_queries(self):
+        for _ in range(10):
+            BookingFactory(good=True)
+        # Savepoint, lock, aggregate, update, last link, bookings, entries,
+        # links and release.
+        with self.assertNumQueries(9):
+            Booking.objects.finalize()
+        self.assertEqual(ChainLink.objects.count(), 14)
+
+    def test_verify_incremental(self):
+        self.assertEqual(verify_chain(), 4)
+        self.assertEqual(ChainCheckpoint.objects.get().sequence, 4)
+        self.assertEqual(verify_chain(), 0)
+        b = BookingFactory(good=True)
+        Booking.objects.finalize()
+        # Checkpoint, its link, unchained bookings, new links, their entries
+        # and the new checkpoint.
+        with self.assertNumQueries(6):
+            self.assertEqual(verify_chain(chunk_size=2), 1)
+        # Links before the checkpoint are only rehashed by a full verification.
+        Booking.objects.filter(pk=self.bookings[1].pk).update(text="Changed")
+        self.assertEqual(verify_chain(), 0)
+        with self.assertRaises(ChainError) as cm:
+            verify_chain(full=True)
+        self.assertEqual(cm.exception.sequence, 2)
+        b = BookingFactory(good=True)
+        Booking.objects.finalize()
+        Booking.objects.filter(pk=b.pk).update(text="Changed")
+        self.assertRaises(ChainError, verify_chain)
+
+    def test_tampered_entry(self):
+        entry = self.bookings[2].entries.first()
+        # Bypasses the done lock of regular deletes.
+        models.QuerySet.delete(Entry.objects.filter(pk=entry.pk))
+        with self.assertRaises(ChainError) as cm:
+            verify_chain()
+        self.assertEqual(cm.exception.sequence, 3)
+
+    def test_unchained(self):
+        b = BookingFactory(good=True)
+        Booking.objects.filter(pk=b.pk).update(done=True)
+        self.assertRaises(ChainError, verify_chain)
+        self.assertEqual(chain_unlinked(), 1)
+        self.assertEqual(verify_chain(), 5)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("kesha_verify_chain", stdout=out)
+        self.assertIn("Verified 4 links.", out.getvalue())
+        ChainLink.objects.filter(sequence=4).update(digest="0" * 64)
+        self.assertRaises(
+            CommandError, call_command, "kesha_verify_chain", stdout=StringIO()
+        )
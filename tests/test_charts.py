@@ -0,0 +1,133 @@
+import io
+import tempfile
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase
+from kesha.charts import load_chart, read_chart_csv, unique_slugs
+from kesha.models import Account, Parent, ParentClosure
+from pathlib import Path
+from tests.factories import ActiveAccountFactory, PassiveParentFactory
+
+CHART = [
+    {
+        "name": "Assets",
+        "active": True,
+        "children": [
+            {
+                "name": "Current",
+                "children": [{"name": "Bank", "accounts": [{"name": "Checking"}]}],
+                "accounts": [{"name": "Cash"}, {"name": "Clearing", "virtual": True}],
+            }
+        ],
+    },
+    {"name": "Liabilities", "active": False, "accounts": [{"name": "Cash"}]},
+]
+
+CHART_CSV = """type,path,name,active,virtual
+parent,,Assets,true,
+parent,Assets,Current,,
+parent,Assets/Current,Bank,,
+account,Assets/Current/Bank,Checking,,
+account,Assets/Current,Cash,,
+account,Assets/Current,Clearing,,true
+parent,,Liabilities,false,
+account,Liabilities,Cash,,
+"""
+
+
+class ChartTestCase(TestCase):
+    def assertLoaded(self):
+        bank = Parent.objects.get(name="Bank")
+        self.assertTrue(bank.active)
+        self.assertEqual(
+            list(
+                ParentClosure.objects.filter(descendant=bank)
+                .order_by("-depth")
+                .values_list("ancestor__name", flat=True)
+            ),
+            ["Assets", "Current", "Bank"],
+        )
+        self.assertFalse(Parent.objects.get(name="Liabilities").active)
+        self.assertEqual(
+            set(Account.objects.values_list("slug", flat=True)),
+            {"checking", "cash", "cash-2", "clearing"},
+        )
+        self.assertTrue(Account.objects.get(name="Clearing").virtual)
+        self.assertEqual(Account.objects.get(name="Checking").parent, bank)
+
+    def test_load_chart(self):
+        # Savepoints, three slug lookups (one for the renamed duplicate Cash),
+        # per level an insert and a primary key lookup (skipped where inserts
+        # return rows), then the closure and the accounts.
+        with self.assertNumQueries(13):
+            parents, accounts = load_chart(CHART)
+        self.assertEqual(len(parents), 4)
+        self.assertEqual(len(accounts), 4)
+        self.assertLoaded()
+        self.assertEqual(ParentClosure.objects.count(), 1 + 2 + 3 + 1)
+
+    def test_load_below_parent(self):
+        root = PassiveParentFactory()
+        parents, _ = load_chart([{"name": "Current"}], root)
+        self.assertFalse(parents[0].active)
+        self.assertEqual(list(root.descendants(include_self=False)), parents)
+        parents[0].save()
+        self.assertEqual(ParentClosure.objects.filter(descendant=parents[0]).count(), 2)
+
+    def test_slug_collisions(self):
+        ActiveAccountFactory(name="Cash")
+        ActiveAccountFactory(name="Cash 2")
+        self.assertEqual(
+            unique_slugs(Account, ["Cash", "Cash", "Bank"]),
+            ["cash-3", "cash-4", "bank"],
+        )
+
+    def test_invalid(self):
+        self.assertRaises(ValidationError, load_chart, [{"name": "Assets"}])
+        self.assertRaises(
+            ValidationError,
+            load_chart,
+            [{"name": "Assets", "active": True, "accounts": [{"name": "A"}] * 2}],
+        )
+        self.assertFalse(Parent.objects.exists())
+
+    def test_read_csv(self):
+        self.assertEqual(read_chart_csv(io.StringIO(CHART_CSV)), CHART_WITH_FLAGS)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "chart.csv"
+            path.write_text(CHART_CSV)
+            out = io.StringIO()
+            call_command("kesha_load_chart", str(path), stdout=out)
+        self.assertIn("Loaded 4 parents and 4 accounts.", out.getvalue())
+        self.assertLoaded()
+
+
+CHART_WITH_FLAGS = [
+    {
+        "name": "Assets",
+        "active": True,
+        "children": [
+            {
+                "name": "Current",
+                "children": [
+                    {
+                        "name": "Bank",
+                        "accounts": [{"name": "Checking", "virtual": False}],
+                    }
+                ],
+                "accounts": [
+                    {"name": "Cash", "virtual": False},
+                    {"name": "Clearing", "virtual": True},
+                ],
+            }
+        ],
+    },
+    {
+        "name": "Liabilities",
+        "active": False,
+        "accounts": [{"name": "Cash", "virtual": False}],
+    },
+]
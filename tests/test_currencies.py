@@ -0,0 +1,51 @@
+from datetime import date
+from django.test import TestCase
+from djmoney.money import Money
+from kesha.models import Booking, Entry, Parent, Period
+from tests.factories import ActiveAccountFactory, ActiveParentFactory
+
+
+class CurrencySumsTestCase(TestCase):
+    def setUp(self):
+        self.root = ActiveParentFactory()
+        self.bank = ActiveAccountFactory(parent=ActiveParentFactory(parent=self.root))
+        self.revenue = ActiveAccountFactory(parent=self.root)
+        self.book(date(2020, 5, 1), Money(100, "EUR"))
+        self.book(date(2021, 5, 1), Money(30, "USD"))
+        self.book(date(2021, 6, 1), Money(20, "EUR"))
+
+    def book(self, day, amount):
+        b = Booking.objects.create(text=f"Booking {day}", date=day)
+        Entry.objects.create(account=self.bank, booking=b, debit=amount)
+        Entry.objects.create(account=self.revenue, booking=b, credit=amount)
+
+    def assertCurrencySums(self):
+        self.assertEqual(
+            self.bank.get_currency_sums(),
+            {
+                "EUR": {"debit": Money(120, "EUR"), "credit": Money(0, "EUR")},
+                "USD": {"debit": Money(30, "USD"), "credit": Money(0, "USD")},
+            },
+        )
+        sums = self.root.get_currency_sums()
+        self.assertEqual(sums["EUR"]["debit"], Money(120, "EUR"))
+        self.assertEqual(sums["EUR"]["credit"], Money(120, "EUR"))
+        self.assertEqual(sums["USD"]["credit"], Money(30, "USD"))
+        (root,) = Parent.objects.trial_balance()
+        self.assertEqual(root.currencies, sums)
+
+    def test_currency_sums(self):
+        # Last closed period and one aggregate grouped by currency.
+        with self.assertNumQueries(2):
+            self.root.get_currency_sums()
+        self.assertCurrencySums()
+        self.assertEqual(
+            self.revenue.get_currency_sums(as_of=date(2020, 12, 31)),
+            {"EUR": {"debit": Money(0, "EUR"), "credit": Money(100, "EUR")}},
+        )
+
+    def test_currency_sums_after_close(self):
+        Period.objects.create(
+            name="2021", start=date(2021, 1, 1), end=date(2021, 12, 31)
+        ).close()
+        self.assertCurrencySums()
@@ -0,0 +1,78 @@
+from django.db.models import F
+from django.test import TestCase
+from djmoney.money import Money
+from kesha.models import Entry, ModelDoneError
+from tests.factories import ActiveAccountFactory, BookingFactory
+
+
+class EntryBulkWriteTestCase(TestCase):
+    def setUp(self):
+        self.a = ActiveAccountFactory()
+        self.open = BookingFactory(good=True)
+        self.done = BookingFactory(good=True)
+        self.done.done = True
+        self.done.save()
+
+    def new_entries(self, *bookings):
+        return [
+            Entry(account=self.a, booking=booking, debit=Money(1, "EUR"))
+            for booking in bookings
+        ]
+
+    def test_bulk_create(self):
+        # Savepoint, check (locking the bookings), insert and release.
+        with self.assertNumQueries(4):
+            Entry.objects.bulk_create(self.new_entries(self.open, self.open))
+        self.assertEqual(self.open.entries.count(), 4)
+
+    def test_bulk_create_done(self):
+        entries = self.new_entries(self.open, self.done)
+        self.assertRaises(ModelDoneError, Entry.objects.bulk_create, entries)
+        self.assertEqual(self.open.entries.count(), 2)
+
+    def test_bulk_update(self):
+        entries = list(self.open.entries.all())
+        for entry in entries:
+            entry.account = self.a
+        # Savepoint, one check and one update (not a check per batch) and release.
+        with self.assertNumQueries(4):
+            Entry.objects.bulk_update(entries, ["account"])
+        self.assertEqual(self.a.entries.count(), 2)
+
+    def test_bulk_update_done(self):
+        entries = list(self.open.entries.all()) + list(self.done.entries.all())
+        for entry in entries:
+            entry.account = self.a
+        self.assertRaises(
+            ModelDoneError, Entry.objects.bulk_update, entries, ["account"]
+        )
+        entry = self.done.entries.first()
+        entry.booking = self.open
+        self.assertRaises(
+            ModelDoneError, Entry.objects.bulk_update, [entry], ["booking"]
+        )
+        self.assertFalse(self.a.entries.exists())
+
+    def test_update(self):
+        # Savepoint, check, update and release.
+        with self.assertNumQueries(4):
+            self.open.entries.update(account=self.a)
+        self.assertRaises(ModelDoneError, Entry.objects.all().update, account=self.a)
+        self.assertRaises(ModelDoneError, self.open.entries.update, booking=self.done)
+        self.assertRaises(
+            ModelDoneError, self.open.entries.update, booking=str(self.done.pk)
+        )
+        self.assertRaises(
+            ModelDoneError, self.open.entries.update, booking_id=self.done.pk
+        )
+        self.assertRaises(
+            ValueError, self.open.entries.update, booking=F("booking") + 1
+        )
+        self.assertEqual(self.done.entries.filter(account=self.a).count(), 0)
+
+    def test_delete(self):
+        self.assertRaises(ModelDoneError, Entry.objects.all().delete)
+        self.assertRaises(ModelDoneError, self.done.entries.first().delete)
+        self.assertEqual(self.done.entries.count(), 2)
+        self.open.entries.all().delete()
+        self.assertFalse(self.open.entries.exists())
@@ -0,0 +1,68 @@
+import csv
+import json
+
+from datetime import date
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.exceptions import PermissionDenied
+from django.test import RequestFactory, TestCase
+from kesha.exporters import export_journal
+from kesha.models import Booking, Entry, Period
+from kesha.views import journal_export
+from tests.factories import BookingFactory
+
+
+class JournalExportTestCase(TestCase):
+    def setUp(self):
+        self.b = BookingFactory(good=True)
+        self.old = BookingFactory(good=True)
+        Booking.objects.filter(pk=self.old.pk).update(date=date(2020, 1, 1))
+
+    def test_csv(self):
+        with self.assertNumQueries(1):
+            rows = list(csv.DictReader(export_journal("csv")))
+        self.assertEqual(len(rows), Entry.objects.count())
+        self.assertEqual(rows[0]["booking"], str(self.old.pk))
+        self.assertEqual(rows[0]["date"], "2020-01-01")
+        debit = next(row for row in rows if row["debit"])
+        self.assertEqual(debit["debit_currency"], "EUR")
+        self.assertEqual(debit["credit"], "")
+
+    def test_jsonl(self):
+        lines = list(export_journal("jsonl", self.b.entries.all(), chunk_size=1))
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual({row["booking"] for row in rows}, {self.b.pk})
+        self.assertEqual(
+            sorted(row["debit"] or row["credit"] for row in rows), ["100.00"] * 2
+        )
+
+    def test_unsupported_format(self):
+        self.assertRaises(ValueError, export_journal, "xml")
+
+    def test_view(self):
+        request = RequestFactory().get("/journal.jsonl", {"start": "2021-01-01"})
+        request.user = User.objects.create_superuser("auditor")
+        response = journal_export(request, "jsonl")
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in response.streaming_content]
+        self.assertEqual({row["booking"] for row in rows}, {self.b.pk})
+
+    def test_view_archived(self):
+        period = Period.objects.create(
+            name="2020", start=date(2020, 1, 1), end=date(2020, 12, 31)
+        )
+        period.close()
+        period.archive()
+        user = User.objects.create_superuser("auditor")
+        for archived, booking in [("1", self.old), ("true", self.old), ("0", self.b)]:
+            request = RequestFactory().get("/journal.jsonl", {"archived": archived})
+            request.user = user
+            response = journal_export(request, "jsonl")
+            rows = [json.loads(line) for line in response.streaming_content]
+            self.assertEqual({row["booking"] for row in rows}, {booking.pk})
+            self.assertEqual(len(rows), 2)
+
+    def test_view_permission(self):
+        request = RequestFactory().get("/journal.csv")
+        request.user = AnonymousUser()
+        self.assertRaises(PermissionDenied, journal_export, request, "csv")
@@ -0,0 +1,81 @@
+from decimal import Decimal
+from django.test import TestCase, override_settings
+from djmoney.money import Money
+from kesha.models import AccountBalance, Booking, Entry, ModelDoneError
+from tests.factories import ActiveAccountFactory, BookingFactory
+
+
+class FinalizeTestCase(TestCase):
+    def setUp(self):
+        self.good = [BookingFactory(good=True) for _ in range(3)]
+        self.bad = BookingFactory()
+        Entry.objects.create(
+            account=ActiveAccountFactory(),
+            booking=self.good[0],
+            credit=Money(100.00, "EUR"),
+            virtual=True,
+        )
+
+    def test_finalize(self):
+        # Savepoint, lock, aggregate, update and release.
+        with self.assertNumQueries(5):
+            unbalanced = Booking.objects.finalize()
+        self.assertEqual(unbalanced, [self.bad])
+        self.assertEqual(unbalanced[0].debit_total, Decimal("100.00"))
+        self.assertEqual(unbalanced[0].credit_total, Decimal("0.00"))
+        self.assertEqual(set(Booking.objects.filter(done=True)), set(self.good))
+        self.assertFalse(Booking.objects.get(pk=self.bad.pk).done)
+
+    def test_finalize_queryset(self):
+        Booking.objects.finalize(Booking.objects.filter(pk=self.good[0].pk))
+        self.assertEqual(list(Booking.objects.filter(done=True)), [self.good[0]])
+
+    def test_finalize_done(self):
+        Booking.objects.finalize(Booking.objects.filter(pk=self.good[0].pk))
+        self.assertRaises(
+            ModelDoneError, Booking.objects.finalize, Booking.objects.all()
+        )
+        self.assertEqual(Booking.objects.filter(done=True).count(), 1)
+
+    @override_settings(KESHA_ACCOUNT_BALANCES=True)
+    def test_finalize_updates_balances(self):
+        Booking.objects.finalize()
+        account = self.good[1].entries.get(debit=None).account
+        self.assertEqual(AccountBalance.objects.get(account=account).credit, 100)
+        self.assertFalse(
+            AccountBalance.objects.filter(account__entries__booking=self.bad).exists()
+        )
+
+
+class BookingWorklistTestCase(TestCase):
+    def setUp(self):
+        self.good = BookingFactory(good=True)
+        self.bad = BookingFactory()
+        self.done = BookingFactory(good=True)
+        self.done.done = True
+        self.done.save()
+        # Virtual entries do not unbalance a booking.
+        Entry.objects.create(
+            account=ActiveAccountFactory(),
+            booking=self.good,
+            credit=Money(30.00, "EUR"),
+            virtual=True,
+        )
+
+    def test_with_totals(self):
+        totals = {
+            b.pk: (b.debit_total, b.credit_total, b.imbalance)
+            for b in Booking.objects.with_totals()
+        }
+        self.assertEqual(totals[self.good.pk], (Decimal("100.00"),) * 2 + (0,))
+        self.assertEqual(totals[self.bad.pk], (Decimal("100.00"), 0, Decimal("100.00")))
+
+    def test_open_unbalanced(self):
+        Booking.objects.filter(pk=self.bad.pk).update(done=True)
+        bad = BookingFactory()
+        with self.assertNumQueries(1):
+            worklist = list(Booking.objects.open().unbalanced())
+        self.assertEqual(worklist, [bad])
+        self.assertEqual(worklist[0].imbalance, Decimal("100.00"))
+        self.assertEqual(Booking.objects.unbalanced().count(), 2)
+        self.assertEqual([b.pk for b in Booking.objects.open()], [self.good.pk, bad.pk])
@@ -0,0 +1,71 @@
+import io
+import json
+import tempfile
+
+from decimal import Decimal
+from django.core.management import call_command
+from django.db.utils import IntegrityError
+from django.test import TestCase
+from kesha.importers import import_entries, read_entries
+from kesha.models import Booking, Entry
+from pathlib import Path
+from tests.factories import ActiveAccountFactory
+from tests.test_bulk_import import ENTRIES_FILENAME, get_entries
+
+
+class ImportTestCase(TestCase):
+    def setUp(self):
+        self.a = ActiveAccountFactory()
+        self.entries = get_entries()
+
+    def import_file(self, path, *args):
+        out = io.StringIO()
+        call_command("kesha_import", str(path), self.a.slug, *args, stdout=out)
+        return out.getvalue()
+
+    def assertImported(self):
+        self.assertEqual(Booking.objects.count(), len(self.entries))
+        self.assertEqual(
+            sorted(Booking.objects.values_list("text", flat=True)),
+            sorted(entry["text"] for entry in self.entries),
+        )
+        self.assertEqual(
+            self.a.get_entry_sum("debit"),
+            sum(Decimal(str(entry.get("debit", 0))) for entry in self.entries),
+        )
+
+    def test_import_yaml(self):
+        output = self.import_file(ENTRIES_FILENAME, "--chunk-size", "2")
+        self.assertEqual(output.splitlines(), ["2 rows imported", "3 rows imported"])
+        self.assertImported()
+
+    def test_import_csv(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "entries.csv"
+            lines = ["text,debit,credit"] + [
+                f"\"{e['text']}\",{e.get('debit', '')},{e.get('credit', '')}"
+                for e in self.entries
+            ]
+            path.write_text("\n".join(lines), encoding="utf-8")
+            self.import_file(path)
+        self.assertImported()
+
+    def test_import_jsonl(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "entries.jsonl"
+            path.write_text("\n".join(json.dumps(e) for e in self.entries))
+            self.import_file(path)
+        self.assertImported()
+
+    def test_resume(self):
+        broken = self.entries[:2] + [{"text": "Broken", "debit": 1, "credit": 1}]
+        progress = import_entries(iter(broken), self.a, "source", chunk_size=2)
+        self.assertEqual(next(progress), 2)
+        self.assertRaises(IntegrityError, next, progress)
+        self.assertEqual(Entry.objects.count(), 2)
+        lines = "\n".join(json.dumps(e) for e in self.entries)
+        fixed = read_entries(io.StringIO(lines), "jsonl")
+        self.assertEqual(
+            list(import_entries(fixed, self.a, "source", chunk_size=2)), [3]
+        )
+        self.assertImported()
@@ -0,0 +1,32 @@
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from tests.factories import BookingFactory
+
+
+@skipUnless(connection.vendor == "sqlite", "Query plans are checked on SQLite")
+class IndexUsageTestCase(TestCase):
+    def setUp(self):
+        self.b = BookingFactory(good=True)
+        self.account = self.b.entries.first().account
+
+    def query_plan(self, func):
+        """Returns the query plan of the last query func executes."""
+        with CaptureQueriesContext(connection) as context:
+            func()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {context.captured_queries[-1]['sql']}")
+            return " ".join(row[-1] for row in cursor.fetchall())
+
+    def test_account_sum(self):
+        plan = self.query_plan(lambda: self.account.get_entry_sum("debit"))
+        self.assertIn("COVERING INDEX kesha_entry_account_sums_idx", plan)
+
+    def test_booking_sum(self):
+        plan = self.query_plan(lambda: self.b.get_entry_sum("debit"))
+        self.assertIn("COVERING INDEX kesha_entry_booking_sums_idx", plan)
+
+    def test_parent_sum(self):
+        plan = self.query_plan(lambda: self.account.parent.get_sums())
+        self.assertIn("INDEX kesha_entry_account_sums_idx", plan)
@@ -0,0 +1,58 @@
+from django.test import TestCase
+from kesha.instrumentation import OPERATIONS, Recorder, max_queries
+from kesha.models import Booking
+from tests.factories import ActiveParentFactory, BookingFactory
+from tests.test_bulk_import import get_entries
+
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        self.b = BookingFactory(good=True)
+        self.parent = self.b.entries.first().account.parent
+
+    def test_registry(self):
+        for operation in [
+            "Parent.get_sum",
+            "Account.get_entry_sum",
+            "Booking.get_entry_sum",
+            "Booking.save",
+            "BookingManager.bulk_import",
+        ]:
+            self.assertIn(operation, OPERATIONS)
+
+    def test_recorder(self):
+        with Recorder() as recorder:
+            self.parent.debit
+            self.parent.credit
+            self.b.done = True
+            self.b.save()
+        self.assertEqual(recorder["Parent.get_sum"].calls, 2)
+        self.assertEqual(recorder["Parent.get_sum"].queries, 2)
+        self.assertEqual(recorder["Booking.save"].calls, 1)
+        self.assertEqual(recorder["Booking.get_entry_sum"].calls, 2)
+        self.assertGreaterEqual(
+            recorder["Booking.save"].queries, recorder["Booking.get_entry_sum"].queries
+        )
+        self.assertGreater(recorder["Parent.get_sum"].seconds, 0)
+        self.assertEqual(recorder["Account.get_entry_sum"].calls, 0)
+        self.assertIn("Parent.get_sum", recorder.report())
+
+    def test_max_queries(self):
+        # Savepoint, closed period check, bookings insert, their primary keys
+        # (SQLite can't return ids of bulk inserts), the entries insert with its
+        # savepoint, check and release, and release.
+        with max_queries("BookingManager.bulk_import", 9):
+            Booking.objects.bulk_import(get_entries(), self.b.entries.first().account)
+        for _ in range(3):
+            ActiveParentFactory(parent=self.parent)
+        with max_queries("Parent.get_sum", 1):
+            self.parent.debit
+        with self.assertRaises(AssertionError):
+            with max_queries("Parent.get_sum", 0):
+                self.parent.debit
+
+    def test_inactive(self):
+        with Recorder() as recorder:
+            pass
+        self.parent.debit
+        self.assertEqual(recorder["Parent.get_sum"].calls, 0)
@@ -96,26 +96,27 @@ class KeshaTestCase(TestCase):
         root_nodes = Parent.objects.get_roots()
         expectations = [
             {
-                "name": "Active Parent 031",
+                "name": self.p.name,
                 "debit": Decimal("0.0"),
                 "credit": Decimal("0.0"),
             },
             {
-                "name": "Active Parent 032",
+                "name": self.a.parent.name,
                 "debit": Decimal("0.0"),
                 "credit": Decimal("0.0"),
             },
             {
-                "name": "Active Parent 033",
+                "name": self.b.entries.get(credit=None).account.parent.name,
                 "debit": Decimal("100.0"),
                 "credit": Decimal("0.0"),
             },
             {
-                "name": "Active Parent 034",
+                "name": self.b.entries.get(debit=None).account.parent.name,
                 "debit": Decimal("0.0"),
                 "credit": Decimal("100.0"),
             },
         ]
+        self.assertEqual(len(root_nodes), len(expectations))
         for node, exp in zip(root_nodes, expectations):
             self.assertEqual(node.name, exp["name"])
             self.assertEqual(node.debit, exp["debit"])
@@ -0,0 +1,122 @@
+from datetime import date
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.test import TestCase
+from djmoney.money import Money
+from kesha.models import (
+    Booking,
+    ClosingBalance,
+    Entry,
+    ModelDoneError,
+    Parent,
+    Period,
+)
+from tests.factories import ActiveAccountFactory, ActiveParentFactory, BookingFactory
+
+
+class PeriodTestCase(TestCase):
+    def setUp(self):
+        self.p = ActiveParentFactory()
+        self.debit = ActiveAccountFactory(parent=self.p)
+        self.credit = ActiveAccountFactory(parent=self.p)
+        self.y2020 = Period.objects.create(
+            name="2020", start=date(2020, 1, 1), end=date(2020, 12, 31)
+        )
+        self.y2021 = Period.objects.create(
+            name="2021", start=date(2021, 1, 1), end=date(2021, 12, 31)
+        )
+        for day in [date(2020, 5, 1), date(2021, 5, 1), date.today()]:
+            self.book(day)
+
+    def book(self, day, amount=100):
+        b = Booking.objects.create(text=f"Booking {day}", date=day)
+        Entry.objects.create(account=self.debit, booking=b, debit=Money(amount, "EUR"))
+        Entry.objects.create(
+            account=self.credit, booking=b, credit=Money(amount, "EUR")
+        )
+        return b
+
+    def test_close(self):
+        self.y2020.close()
+        self.assertTrue(self.y2020.closed)
+        self.assertTrue(self.y2020.bookings.get().done)
+        self.assertEqual(Booking.objects.filter(done=True).count(), 1)
+        balance = ClosingBalance.objects.get(period=self.y2020, account=self.debit)
+        self.assertEqual(balance.debit, Decimal("100.00"))
+        self.y2021.close()
+        balance = ClosingBalance.objects.get(period=self.y2021, account=self.debit)
+        self.assertEqual(balance.debit, Decimal("200.00"))
+
+    def test_sums_after_close(self):
+        self.y2020.close()
+        self.y2021.close()
+        # Entries before the closed periods are no longer aggregated.
+        models.QuerySet.delete(Entry.objects.filter(booking__date__year=2020))
+        self.assertEqual(self.debit.debit, Decimal("300.00"))
+        self.assertEqual(self.credit.credit, Decimal("300.00"))
+        self.assertEqual(self.p.debit, Decimal("300.00"))
+        (root,) = [n for n in Parent.objects.trial_balance() if n.node == self.p]
+        self.assertEqual(root.debit, Decimal("300.00"))
+
+    def test_close_twice(self):
+        self.y2020.close()
+        self.assertRaises(ModelDoneError, self.y2020.close)
+
+    def test_close_out_of_order(self):
+        self.y2021.close()
+        self.assertRaises(ValidationError, self.y2020.close)
+
+    def test_close_open_period(self):
+        period = Period.objects.create(name="Now", start=date.today(), end=date.today())
+        self.assertRaises(ValidationError, period.close)
+
+    def test_close_unbalanced(self):
+        b = BookingFactory()
+        Booking.objects.filter(pk=b.pk).update(date=date(2020, 6, 1))
+        self.assertRaises(ValidationError, self.y2020.close)
+        self.assertFalse(Period.objects.get(pk=self.y2020.pk).closed)
+        self.assertFalse(Booking.objects.filter(done=True).exists())
+        self.assertFalse(ClosingBalance.objects.exists())
+
+    def test_booking_into_closed_period(self):
+        self.y2020.close()
+        self.assertRaises(ValidationError, self.book, date(2020, 7, 1))
+        self.assertRaises(
+            ValidationError,
+            Booking.objects.bulk_import,
+            [{"text": "Late", "debit": 1, "date": date(2020, 7, 1)}],
+            self.debit,
+        )
+
+    def test_finalize_into_closed_period(self):
+        self.y2020.close()
+        b = self.book(date.today())
+        b.date = date(2020, 7, 1)
+        b.done = True
+        self.assertRaises(ValidationError, b.save)
+        self.assertFalse(Booking.objects.get(pk=b.pk).done)
+        self.assertEqual(self.debit.debit, Decimal("400.00"))
+
+    def test_as_of(self):
+        self.assertEqual(
+            self.debit.get_entry_sum("debit", as_of=date(2020, 12, 31)), 100
+        )
+        self.assertEqual(self.p.get_sum("debit", as_of=date(2021, 12, 31)), 200)
+        self.y2020.close()
+        self.y2021.close()
+        self.assertEqual(
+            self.debit.get_entry_sum("debit", as_of=date(2020, 12, 31)), 100
+        )
+        self.assertEqual(self.p.get_sum("credit", as_of=date(2021, 6, 1)), 200)
+        self.assertEqual(self.p.get_sum("credit", as_of=date(2019, 1, 1)), 0)
+        (root,) = Parent.objects.trial_balance(as_of=date(2020, 12, 31))
+        self.assertEqual(root.debit, 100)
+
+    def test_date_range(self):
+        self.y2020.close()
+        start, end = date(2021, 1, 1), date(2021, 12, 31)
+        self.assertEqual(self.debit.get_entry_sum("debit", start, end), 100)
+        self.assertEqual(self.p.get_sum("debit", start=start), 200)
+        self.assertEqual(Booking.objects.between(start, end).count(), 1)
+        self.assertEqual(Booking.objects.as_of(end).count(), 2)
@@ -0,0 +1,86 @@
+from io import StringIO
+from decimal import Decimal
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from djmoney.money import Money
+from kesha.models import Account, AccountBalance, Entry
+from kesha.recompute import recompute, recompute_chunk
+from tests.factories import ActiveAccountFactory, BookingFactory
+
+
+class RecomputeSetup:
+    def setUp(self):
+        self.b = BookingFactory(good=True)
+        self.b.done = True
+        self.b.save()
+        self.open = BookingFactory(good=True)
+        self.virtual = ActiveAccountFactory(virtual=True)
+        Entry.objects.create(
+            account=self.virtual,
+            booking=self.open,
+            debit=Money(50.00, "EUR"),
+            virtual=True,
+        )
+
+
+class RecomputeTestCase(RecomputeSetup, TestCase):
+    def call(self, *args):
+        out = StringIO()
+        call_command("kesha_recompute", "--workers", "1", *args, stdout=out)
+        return out.getvalue()
+
+    def test_chunk_matches_entry_sums(self):
+        accounts = list(Account.objects.all())
+        sums = recompute_chunk([a.pk for a in accounts])
+        for account in accounts:
+            for column in ("debit", "credit"):
+                self.assertEqual(
+                    sums[account.pk][column], account.get_entry_sum(column)
+                )
+
+    def test_chunks(self):
+        # The account ids, then a period lookup and an aggregate per chunk.
+        with self.assertNumQueries(7):
+            sums = recompute(Account.objects.all(), workers=1, chunk_size=2)
+        self.assertEqual(len(sums), Account.objects.count())
+        self.assertEqual(sums[self.virtual.pk]["debit"], Decimal("50.00"))
+
+    def test_command(self):
+        out = self.call("--verbosity", "2")
+        self.assertIn(f"{self.virtual.slug} 50", out)
+        self.assertIn("5 accounts: debit 250", out)
+
+    def test_command_parent(self):
+        out = self.call("--parent", self.virtual.parent.slug)
+        self.assertIn("Recomputed balances of 1 accounts", out)
+        self.assertRaises(CommandError, self.call, "--parent", "missing")
+
+    def test_materialize_and_audit(self):
+        self.call("--materialize", "--chunk-size", "1")
+        self.assertEqual(AccountBalance.objects.count(), Account.objects.count())
+        self.assertEqual(
+            AccountBalance.objects.get(account=self.virtual).debit, Decimal(0)
+        )
+        self.call("--audit")
+        AccountBalance.objects.filter(account=self.virtual).update(debit=1)
+        self.assertRaises(CommandError, self.call, "--audit")
+
+    def test_in_transaction(self):
+        # The caller's transaction (here the test's) keeps the work serial.
+        with self.assertNumQueries(7):
+            recompute(Account.objects.all(), workers=2, chunk_size=2)
+        self.assertTrue(connection.in_atomic_block)
+
+
+class RecomputePoolTestCase(RecomputeSetup, TransactionTestCase):
+    def test_pool(self):
+        if connection.is_in_memory_db():
+            self.skipTest("Worker processes can't share an in-memory database.")
+        accounts = Account.objects.all()
+        serial = recompute(accounts, workers=1, chunk_size=2)
+        self.assertEqual(recompute(accounts, workers=2, chunk_size=2), serial)
+        self.assertEqual(serial[self.virtual.pk]["debit"], Decimal("50.00"))
+        recompute(accounts, workers=2, chunk_size=2, materialize=True)
+        self.assertEqual(AccountBalance.objects.count(), accounts.count())
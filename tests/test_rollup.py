@@ -0,0 +1,78 @@
+from datetime import date
+from decimal import Decimal
+from django.test import TestCase, override_settings
+from djmoney.money import Money
+from kesha.models import Account, Entry, Parent, Period
+from tests.factories import (
+    ActiveParentFactory,
+    ActiveAccountFactory,
+    BookingFactory,
+)
+
+
+class RollupTestCase(TestCase):
+    def setUp(self):
+        self.root = ActiveParentFactory()
+        self.child = ActiveParentFactory(parent=self.root)
+        self.grandchild = ActiveParentFactory(parent=self.child)
+        self.b = BookingFactory(good=True)
+        for entry, parent in zip(self.b.entries.all(), [self.child, self.grandchild]):
+            account = entry.account
+            account.parent = parent
+            account.save()
+        Entry.objects.create(
+            account=ActiveAccountFactory(parent=self.grandchild),
+            booking=self.b,
+            credit=Money(50.00, "EUR"),
+            virtual=True,
+        )
+
+    def assertSums(self):
+        self.assertEqual(self.root.debit, Decimal("100.00"))
+        self.assertEqual(self.root.credit, Decimal("100.00"))
+        self.assertEqual(self.child.debit, Decimal("100.00"))
+        self.assertEqual(self.grandchild.debit, Decimal("0.0"))
+        self.assertEqual(self.grandchild.credit, Decimal("100.00"))
+
+    def test_subtree_sums(self):
+        self.assertSums()
+
+    def test_subtree_sums_single_query(self):
+        for _ in range(5):
+            ActiveParentFactory(parent=self.grandchild)
+        with self.assertNumQueries(1):
+            self.root.get_sums()
+        Period.objects.create(
+            name="2020", start=date(2020, 1, 1), end=date(2020, 12, 31)
+        ).close()
+        # The closed period and its closing balances are subqueries.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.root.get_sums()["debit"], Decimal("100.00"))
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.root.get_sums(as_of=date(2020, 12, 31))["debit"], Decimal(0)
+            )
+
+    @override_settings(KESHA_ROLLUP_RECURSIVE_CTE=False)
+    def test_subtree_sums_fallback(self):
+        self.assertSums()
+
+    def test_trial_balance(self):
+        ActiveParentFactory(parent=self.child)
+        with self.assertNumQueries(4):
+            roots = Parent.objects.trial_balance()
+        self.assertEqual(
+            [node.node for node in roots], list(Parent.objects.get_roots())
+        )
+        stack = list(roots)
+        nodes = 0
+        while stack:
+            node = stack.pop()
+            nodes += 1
+            self.assertEqual(node.debit, node.node.debit)
+            self.assertEqual(node.credit, node.node.credit)
+            self.assertEqual(node.balance, node.debit - node.credit)
+            stack.extend(node.children)
+        self.assertEqual(nodes, Parent.objects.count() + Account.objects.count())
+        root = next(node for node in roots if node.node == self.root)
+        self.assertEqual(root.balance, Decimal("0.00"))
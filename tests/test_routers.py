@@ -0,0 +1,91 @@
+import json
+
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from kesha.cache import get_cache
+from kesha.exporters import export_journal
+from kesha.models import Account, Booking, Parent
+from kesha.routers import primary_reads, reporting_reads
+from tests.factories import BookingFactory
+
+
+@override_settings(KESHA_READ_DATABASE="replica")
+class ReadRoutingTestCase(TransactionTestCase):
+    # The replica is never replicated to, so everything read from it is empty.
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.b = BookingFactory(good=True)
+        self.account = self.b.entries.get(credit=None).account
+
+    def assertReplicaQueries(self, func):
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            result = func()
+        self.assertTrue(replica.captured_queries)
+        return result
+
+    def test_reporting_reads_replica(self):
+        self.assertEqual(
+            self.assertReplicaQueries(lambda: self.account.get_entry_sum("debit")),
+            Decimal(0),
+        )
+        self.assertEqual(
+            self.assertReplicaQueries(lambda: self.account.parent.get_sums())["debit"],
+            Decimal(0),
+        )
+        self.assertEqual(self.assertReplicaQueries(Parent.objects.trial_balance), [])
+        self.assertEqual(
+            self.assertReplicaQueries(lambda: list(export_journal("jsonl"))), []
+        )
+
+    def test_regular_reads_primary(self):
+        self.assertEqual(Account.objects.count(), 2)
+        with override_settings(KESHA_READ_DATABASE=None):
+            self.assertEqual(self.account.get_entry_sum("debit"), Decimal("100.00"))
+
+    @override_settings(KESHA_BALANCE_CACHE=True)
+    def test_balance_cache_primary(self):
+        get_cache().clear()
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            self.assertEqual(self.account.debit, Decimal("100.00"))
+            self.assertEqual(self.account.parent.debit, Decimal("100.00"))
+        self.assertFalse(replica.captured_queries)
+        # Uncached reporting reads still go to the replica.
+        self.assertEqual(
+            self.assertReplicaQueries(lambda: self.account.get_entry_sum("debit")),
+            Decimal(0),
+        )
+        self.assertEqual(self.account.debit, Decimal("100.00"))
+
+    def test_reporting_block(self):
+        with reporting_reads():
+            self.assertFalse(Account.objects.with_balances().exists())
+            with primary_reads():
+                self.assertEqual(self.account.get_entry_sum("debit"), Decimal("100.00"))
+        rows = [json.loads(line) for line in export_journal("jsonl")]
+        self.assertEqual(rows, [])
+        with primary_reads():
+            rows = [json.loads(line) for line in export_journal("jsonl")]
+        self.assertEqual(len(rows), 2)
+        with primary_reads():
+            export = export_journal("jsonl")
+        # Streamed after the block, but bound to the primary when created.
+        self.assertEqual(len(list(export)), 2)
+
+    def test_transactions_read_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.account.get_entry_sum("debit"), Decimal("100.00"))
+
+    def test_finalization_checks_on_primary(self):
+        bad = BookingFactory()
+        bad.done = True
+        with reporting_reads():
+            # On the empty replica, the booking would balance.
+            self.assertRaises(ValidationError, bad.save)
+            self.b.done = True
+            self.b.save()
+        self.assertTrue(Booking.objects.get(pk=self.b.pk).done)
+        self.assertFalse(Booking.objects.get(pk=bad.pk).done)
@@ -0,0 +1,64 @@
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from kesha.models import Parent, ParentClosure
+from tests.factories import ActiveParentFactory, ActiveAccountFactory
+
+
+class ParentTreeTestCase(TestCase):
+    def setUp(self):
+        self.root = ActiveParentFactory()
+        self.child = ActiveParentFactory(parent=self.root)
+        self.grandchild = ActiveParentFactory(parent=self.child)
+        self.other = ActiveParentFactory()
+        self.account = ActiveAccountFactory(parent=self.grandchild)
+
+    def test_closure(self):
+        self.assertEqual(
+            ParentClosure.objects.get(
+                ancestor=self.root, descendant=self.grandchild
+            ).depth,
+            2,
+        )
+        self.assertEqual(ParentClosure.objects.filter(ancestor=self.root).count(), 3)
+
+    def test_descendants(self):
+        with self.assertNumQueries(1):
+            descendants = list(self.root.descendants())
+        self.assertEqual(descendants, [self.root, self.child, self.grandchild])
+        self.assertEqual(
+            list(self.root.descendants(include_self=False)),
+            [self.child, self.grandchild],
+        )
+
+    def test_ancestors(self):
+        with self.assertNumQueries(1):
+            ancestors = list(self.grandchild.ancestors(include_self=False))
+        self.assertEqual(ancestors, [self.root, self.child])
+
+    def test_accounts_under(self):
+        with self.assertNumQueries(1):
+            accounts = list(self.root.accounts_under())
+        self.assertEqual(accounts, [self.account])
+        self.assertFalse(self.other.accounts_under().exists())
+
+    def test_reparent(self):
+        self.child.parent = self.other
+        self.child.save()
+        self.assertCountEqual(
+            self.other.descendants(), [self.other, self.child, self.grandchild]
+        )
+        self.assertEqual(list(self.root.descendants()), [self.root])
+        self.assertEqual(list(self.root.accounts_under()), [])
+        self.child.parent = None
+        self.child.save()
+        self.assertEqual(
+            list(Parent.objects.get_roots().descendants()), list(Parent.objects.all())
+        )
+        self.assertEqual(
+            list(self.grandchild.ancestors()), [self.child, self.grandchild]
+        )
+
+    def test_reparent_below_itself(self):
+        self.root.parent = self.grandchild
+        self.assertRaises(ValidationError, self.root.save)
+        self.assertIsNone(Parent.objects.get(pk=self.root.pk).parent)